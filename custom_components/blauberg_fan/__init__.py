@@ -1,9 +1,15 @@
 """The blauberg_fan integration."""
 from __future__ import annotations
+from datetime import timedelta
+import asyncio
+from functools import partial
+from typing import Any
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.event import async_track_time_interval
+from homeassistant.helpers.storage import Store
 from homeassistant.const import (
     CONF_DEVICES,
     CONF_HOST,
@@ -14,15 +20,37 @@ from homeassistant.const import (
 )
 
 
-from .blauberg_protocol import BlaubergProtocol
+from .blauberg_protocol import BlaubergProtocol, BlaubergTransport
 from .blauberg_protocol.devices import devices as blauberg_devices
-from .blauberg_coordinator import BlaubergProtocolCoordinator
-from .const import DOMAIN, DEVICES, DEVICE_CONFIG, COORDINATOR
+from .blauberg_coordinator import (
+    BlaubergProtocolCoordinator,
+    MIN_SCAN_INTERVAL,
+    MAX_SCAN_INTERVAL,
+)
+from .const import (
+    DOMAIN,
+    DEVICES,
+    DEVICE_CONFIG,
+    COORDINATOR,
+    TRANSPORT,
+    TRANSPORT_LOCK,
+    RTT_STORE,
+    RTT_SAVE_TIMER,
+    CONF_MIN_INTERVAL,
+    CONF_MAX_INTERVAL,
+)
 
 import logging
 
 LOG = logging.getLogger(__name__)
 
+# round trip time estimates of the devices by device id, they survive restarts
+RTT_STORAGE_VERSION = 1
+RTT_STORAGE_KEY = f"{DOMAIN}.rtt"
+# estimates of all devices are saved together periodically, and of a single device when it is unloaded
+RTT_SAVE_INTERVAL = timedelta(minutes=5)
+RTT_SAVE_DELAY = 10
+
 PLATFORMS: list[Platform] = [
     Platform.FAN,
     Platform.SENSOR,
@@ -39,19 +67,62 @@ async def async_setup_entry(
     hass.data.setdefault(DOMAIN, {})
     if DEVICES not in hass.data[DOMAIN]:
         hass.data[DOMAIN][DEVICES] = {}
+    # entries are set up concurrently, only the first one starts the transport
+    async with hass.data[DOMAIN].setdefault(TRANSPORT_LOCK, asyncio.Lock()):
+        if TRANSPORT not in hass.data[DOMAIN]:
+            # single socket shared by every configured device
+            transport = BlaubergTransport()
+            await transport.async_start()
+            hass.data[DOMAIN][TRANSPORT] = transport
 
     device = entry.data
+    device_config = blauberg_devices.get(device[CONF_TYPE])
+    max_payload = BlaubergProtocol.DEFAULT_MAX_PAYLOAD
+    if device_config is not None and device_config.max_payload is not None:
+        max_payload = device_config.max_payload
     blauberg_protocol = BlaubergProtocol(
         device[CONF_HOST],
         device[CONF_PORT],
         device[CONF_DEVICE_ID],
         device[CONF_PASSWORD],
+        transport=hass.data[DOMAIN][TRANSPORT],
+        max_payload=max_payload,
     )
+    if RTT_STORE not in hass.data[DOMAIN]:
+        store: Store[dict[str, list[float]]] = Store(
+            hass, RTT_STORAGE_VERSION, RTT_STORAGE_KEY
+        )
+        estimates = await store.async_load() or {}
+        hass.data[DOMAIN].setdefault(RTT_STORE, (store, estimates))
+    store, estimates = hass.data[DOMAIN][RTT_STORE]
+    if (estimate := estimates.get(device[CONF_DEVICE_ID])) is not None:
+        blauberg_protocol.restore_rtt_estimate(*estimate)
+
+    if RTT_SAVE_TIMER not in hass.data[DOMAIN]:
+        hass.data[DOMAIN][RTT_SAVE_TIMER] = async_track_time_interval(
+            hass, partial(_async_save_rtt_estimates, hass), RTT_SAVE_INTERVAL
+        )
+
+    @callback
+    def _save_rtt_estimate() -> None:
+        estimate = blauberg_protocol.rtt_estimate
+        if estimate is not None:
+            estimates[device[CONF_DEVICE_ID]] = list(estimate)
+            store.async_delay_save(lambda: estimates, RTT_SAVE_DELAY)
+
     coordinator = BlaubergProtocolCoordinator(
-        hass, blauberg_protocol, device[CONF_TYPE]
+        hass,
+        blauberg_protocol,
+        device[CONF_TYPE],
+        timedelta(
+            seconds=device.get(CONF_MIN_INTERVAL, MIN_SCAN_INTERVAL.total_seconds())
+        ),
+        timedelta(
+            seconds=device.get(CONF_MAX_INTERVAL, MAX_SCAN_INTERVAL.total_seconds())
+        ),
     )
+    entry.async_on_unload(_save_rtt_estimate)
     await coordinator.async_config_entry_first_refresh()
-    device_config = blauberg_devices.get(device[CONF_TYPE])
     if device_config is not None:
         hass.data[DOMAIN][DEVICES][device[CONF_DEVICE_ID]] = {
             DEVICE_CONFIG: device_config,
@@ -65,10 +136,26 @@ async def async_setup_entry(
     return True
 
 
+@callback
+def _async_save_rtt_estimates(hass: HomeAssistant, *_: Any) -> None:
+    """saves the estimates of every set up device,
+    a single save for all of them since delayed saves are postponed by every new one"""
+    store, estimates = hass.data[DOMAIN][RTT_STORE]
+    for device_id, device_data in hass.data[DOMAIN].get(DEVICES, {}).items():
+        estimate = device_data[COORDINATOR].rtt_estimate
+        if estimate is not None:
+            estimates[device_id] = list(estimate)
+    store.async_delay_save(lambda: estimates, RTT_SAVE_DELAY)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     if unload_ok := await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
         if DEVICES in hass.data[DOMAIN]:
             device = entry.data
             hass.data[DOMAIN][DEVICES].pop(device[CONF_DEVICE_ID], None)
+            if not hass.data[DOMAIN][DEVICES] and TRANSPORT in hass.data[DOMAIN]:
+                hass.data[DOMAIN].pop(TRANSPORT).close()
+            if not hass.data[DOMAIN][DEVICES] and RTT_SAVE_TIMER in hass.data[DOMAIN]:
+                hass.data[DOMAIN].pop(RTT_SAVE_TIMER)()
     return unload_ok
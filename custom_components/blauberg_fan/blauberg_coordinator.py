@@ -1,23 +1,33 @@
 """Polling data update coordinator"""
 from __future__ import annotations
 from datetime import timedelta
-from collections.abc import Mapping, Sequence
+from collections.abc import Callable, Mapping
 from typing import Any
+import asyncio
+import time
 
 import async_timeout
 
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.exceptions import HomeAssistantError
 from homeassistant.helpers.entity import DeviceInfo
 from homeassistant.helpers.update_coordinator import (
     DataUpdateCoordinator,
     UpdateFailed,
 )
 
-from .blauberg_protocol import BlaubergProtocol
+from .blauberg_protocol import (
+    BlaubergProtocol,
+    BlaubergProtocolError,
+    BlaubergStats,
+    PreparedRead,
+    blauberg_tracing,
+)
 from .blauberg_protocol.devices import (
     devices as blauberg_devices,
     Purpose,
     ComplexAction,
+    PollingClass,
 )
 
 from .const import DOMAIN
@@ -28,25 +38,69 @@ LOG = logging.getLogger(__name__)
 
 
 SCAN_INTERVAL = timedelta(seconds=5)
+MIN_SCAN_INTERVAL = timedelta(seconds=2)
+MAX_SCAN_INTERVAL = timedelta(seconds=30)
+# the interval is divided by INTERVAL_SPEED_UP when a purpose changed since the last poll
+# and multiplied by INTERVAL_BACK_OFF when nothing changed
+INTERVAL_SPEED_UP = 2
+INTERVAL_BACK_OFF = 1.5
+# slow parameters are read on every Nth poll
+SLOW_POLL_CYCLES = 6
+
+
+class WriteConflictError(HomeAssistantError):
+    """Values written together require different values for the same parameter"""
 
 
 class BlaubergProtocolCoordinator(DataUpdateCoordinator):
     """Blauber Protocol coordinator."""
 
     def __init__(
-        self, hass: HomeAssistant, blauberg_protocol: BlaubergProtocol, device_type: int
+        self,
+        hass: HomeAssistant,
+        blauberg_protocol: BlaubergProtocol,
+        device_type: int,
+        min_interval: timedelta = MIN_SCAN_INTERVAL,
+        max_interval: timedelta = MAX_SCAN_INTERVAL,
     ) -> None:
+        if min_interval > max_interval:
+            raise ValueError("minimum interval can not be greater than maximum interval")
         super().__init__(
             hass,
             LOG,
             name=blauberg_protocol.device_id,
-            update_interval=SCAN_INTERVAL,
+            update_interval=min(max(SCAN_INTERVAL, min_interval), max_interval),
         )
+        self._min_interval = min_interval
+        self._max_interval = max_interval
         self._blauberg_protocol = blauberg_protocol
         self._device_id = blauberg_protocol.device_id
 
         self._device = blauberg_devices.get(device_type)
-        self._batched_params = []
+        self._fast_params: tuple[int, ...] = ()
+        self._slow_params: tuple[int, ...] = ()
+        self._static_params: tuple[int, ...] = ()
+        self._static_read = False
+        self._poll_cycle = 0
+        # data key, its parameters and response parser for every action of the device in parse order
+        self._parse_plan: tuple[
+            tuple[Any, tuple[int, ...], Callable[[Mapping[int, int | None]], Any]], ...
+        ] = ()
+        self._prepared_reads: dict[tuple[int, ...], PreparedRead] = {}
+        # devices answer one frame at a time, polls and writes take turns
+        self._command_lock = asyncio.Lock()
+        # writes waiting for the next frame, merged with the latest value per parameter
+        self._pending_writes: dict[int, int] = {}
+        self._pending_response: asyncio.Future[dict[Any, Any]] | None = None
+        # last known value of every parameter, used to show expected values before the device confirms them
+        self._raw_values: dict[int, int | None] = {}
+        # values shown before the device confirmed them by key, with the sequence of the write that set them
+        self._optimistic: dict[Any, tuple[int, Any]] = {}
+        self._write_sequence = 0
+        # data and availability the listeners were last notified about
+        self._notified_data: Mapping[Any, Any] = {}
+        self._notified_success = True
+        self._notified_listeners: set[Any] = set()
         if self._device is not None:
             actions = []
             for action in self._device.parameter_map.values():
@@ -56,59 +110,125 @@ class BlaubergProtocolCoordinator(DataUpdateCoordinator):
             for attribute_action in self._device.attribute_map.values():
                 actions.append(attribute_action)
 
+            plan = []
+            for attribute, action in self._device.attribute_map.items():
+                plan.append((attribute, tuple(action.parameters), action.response_parser))
+            for optional_action in self._device.extra_parameters:
+                action = optional_action.action
+                plan.append(
+                    (optional_action.name, tuple(action.parameters), action.response_parser)
+                )
+            for purpose, action in self._device.parameter_map.items():
+                plan.append((purpose, tuple(action.parameters), action.response_parser))
+            self._parse_plan = tuple(plan)
+
             params_to_read = {}
             for action in actions:
                 for param in action.parameters:
                     params_to_read[param] = True
 
-            self._batched_params = list(params_to_read.keys())
+            polling_classes = self._device.polling_classes
+            params_by_class: dict[PollingClass, list[int]] = {
+                polling_class: [] for polling_class in PollingClass
+            }
+            for param in params_to_read:
+                params_by_class[
+                    polling_classes.get(param, PollingClass.FAST)
+                ].append(param)
+            self._fast_params = tuple(params_by_class[PollingClass.FAST])
+            self._slow_params = tuple(params_by_class[PollingClass.SLOW])
+            self._static_params = tuple(params_by_class[PollingClass.STATIC])
 
-    def _filter_response_by_params(
-        self, response: dict[int, int | None], params: Sequence[int]
-    ) -> Mapping[int, int | None] | None:
-        result = {}
-        for param in params:
-            if param in response:
-                result[param] = response[param]
-            else:
-                return None
-        return result
+    @property
+    def stats(self) -> BlaubergStats:
+        return self._blauberg_protocol.stats
+
+    @property
+    def rtt_estimate(self) -> tuple[float, float] | None:
+        return self._blauberg_protocol.rtt_estimate
+
+    def _poll_params(self) -> tuple[int, ...]:
+        """parameters of the next poll, static ones until they are read once and slow ones every SLOW_POLL_CYCLES polls"""
+        params = self._fast_params
+        if self._poll_cycle % SLOW_POLL_CYCLES == 0:
+            params += self._slow_params
+        if not self._static_read:
+            params += self._static_params
+        return params
 
-    def _parse_data(self, response: dict[int, int | None]) -> dict[Any, Any]:
+    def _prepared_read(self, params: tuple[int, ...]) -> PreparedRead:
+        """returns the encoded read request for the parameters, it is only built once per parameter set"""
+        prepared = self._prepared_reads.get(params)
+        if prepared is None:
+            prepared = self._blauberg_protocol.prepare_read(params)
+            self._prepared_reads[params] = prepared
+        return prepared
+
+    def _parse_data(self, response: Mapping[int, int | None]) -> dict[Any, Any]:
         if self._device is None:
             raise UpdateFailed("Device is not recognized")
+        tracer = blauberg_tracing.tracer
+        start = time.perf_counter() if tracer is not None else 0.0
         result = {}
-        for attribute in self._device.attribute_map:
-            action = self._device.attribute_map[attribute]
-            filtered_response = self._filter_response_by_params(
-                response, action.parameters
-            )
-            if filtered_response is not None:
-                result[attribute] = action.response_parser(filtered_response)
-        for optional_action in self._device.extra_parameters:
-            action = optional_action.action
-            filtered_response = self._filter_response_by_params(
-                response, action.parameters
-            )
-            if filtered_response is not None:
-                result[optional_action.name] = action.response_parser(filtered_response)
-        for purpose in self._device.parameter_map:
-            action = self._device.parameter_map[purpose]
-            filtered_response = self._filter_response_by_params(
-                response, action.parameters
-            )
-            if filtered_response is not None:
-                result[purpose] = action.response_parser(filtered_response)
+        for key, params, response_parser in self._parse_plan:
+            for param in params:
+                if param not in response:
+                    break
+            else:
+                # response parsers may receive parameters they didn't request
+                result[key] = response_parser(response)
+        if tracer is not None:
+            tracer(blauberg_tracing.PARSE, start, time.perf_counter())
         return result
 
     async def _async_update_data(self):
-        async with async_timeout.timeout(BlaubergProtocol.DEFAULT_TIMEOUT):
-            response = self._blauberg_protocol.read_params(self._batched_params)
-            if response is None:
+        prepared = self._prepared_read(self._poll_params())
+        # frames of split reads to the same device are sent one after another
+        deadline = self._blauberg_protocol.request_deadline * len(prepared.commands)
+        async with self._command_lock, async_timeout.timeout(deadline):
+            start = time.monotonic()
+            try:
+                response = await self._blauberg_protocol.async_read_prepared(prepared)
+            except BlaubergProtocolError as err:
+                raise UpdateFailed(f"Invalid response: {err}") from err
+            finally:
+                self.stats.record_poll(time.monotonic() - start)
+            if not response:
+                if (
+                    self._blauberg_protocol.circuit_open
+                    and self.update_interval is not None
+                ):
+                    # every poll of an unreachable device is a single probe, they don't need to be frequent
+                    self.update_interval = self._max_interval
                 raise UpdateFailed("Timeout or wrong auth")
-            new_data = self._parse_data(response)
+            self._static_read = True
+            self._poll_cycle += 1
+            self._raw_values.update(response)
+            # parameters which were not polled keep their last known values
+            new_data = self._parse_data(self._raw_values)
+            # writes in flight are confirmed by their responses, the poll may have been read before them
+            for key, (_, value) in self._optimistic.items():
+                new_data[key] = value
+            self._adapt_interval(new_data)
             return new_data
 
+    def _adapt_interval(self, new_data: Mapping[Any, Any]) -> None:
+        """polls faster while purposes change and backs off while they are stable,
+        attributes like rpm fluctuate all the time and are not taken into account"""
+        if self.update_interval is None or self._device is None:
+            return
+        previous_data = self.data or {}
+        # a device which answers again after failures may have been changed in the meantime
+        changed = not self.last_update_success or any(
+            previous_data.get(purpose) != new_data.get(purpose)
+            for purpose in self._device.parameter_map
+        )
+        if changed:
+            interval = self.update_interval / INTERVAL_SPEED_UP
+        else:
+            interval = self.update_interval * INTERVAL_BACK_OFF
+        self.update_interval = min(max(interval, self._min_interval), self._max_interval)
+
     def _get_device_action(self, purpose: Purpose) -> ComplexAction:
         if self._device is None:
             raise UpdateFailed("Device is not recognized")
@@ -128,6 +248,31 @@ class BlaubergProtocolCoordinator(DataUpdateCoordinator):
             raise UpdateFailed("{name} is not found in blauberg device config")
         return action
 
+    @callback
+    def async_update_listeners(self) -> None:
+        """Updates listeners whose context keys changed since the last update,
+        listeners without a context and new listeners are always updated, all of them when availability changes"""
+        tracer = blauberg_tracing.tracer
+        start = time.perf_counter() if tracer is not None else 0.0
+        data = self.data or {}
+        previous_data = self._notified_data
+        availability_changed = self.last_update_success != self._notified_success
+        self._notified_data = data
+        self._notified_success = self.last_update_success
+        notified_listeners = set()
+        for remove_listener, (update_callback, context) in list(self._listeners.items()):
+            notified_listeners.add(remove_listener)
+            if (
+                availability_changed
+                or context is None
+                or remove_listener not in self._notified_listeners
+                or any(previous_data.get(key) != data.get(key) for key in context)
+            ):
+                update_callback()
+        self._notified_listeners = notified_listeners
+        if tracer is not None:
+            tracer(blauberg_tracing.DISPATCH, start, time.perf_counter())
+
     async def async_update_data(self, new_data: dict[Any, Any]) -> None:
         """merges existing data with given data, resets intervals and calls listeners"""
         update_data = self.data
@@ -137,33 +282,139 @@ class BlaubergProtocolCoordinator(DataUpdateCoordinator):
         update_data.update(new_data)
         self.async_set_updated_data(update_data)
 
-    async def _do_action(
-        self, value: float | str | int | bool | None, action: ComplexAction
+    async def _async_write(self, request: Mapping[int, int]) -> dict[Any, Any]:
+        """queues the request for the next write frame of the device and waits for the parsed response,
+        requests queued while a frame is in flight are merged and newer values replace older ones"""
+        self._pending_writes.update(request)
+        if self._pending_response is None:
+            self._pending_response = asyncio.get_running_loop().create_future()
+            self.hass.async_create_task(self._async_flush_writes())
+        return await asyncio.shield(self._pending_response)
+
+    async def _async_flush_writes(self) -> None:
+        async with self._command_lock:
+            request, self._pending_writes = self._pending_writes, {}
+            pending_response, self._pending_response = self._pending_response, None
+            if pending_response is None:
+                return
+            try:
+                response = await self._blauberg_protocol.async_write_params(request)
+                if self.update_interval is not None:
+                    # follow up on the device's reaction to the write
+                    self.update_interval = self._min_interval
+                self._raw_values.update(response)
+                parsed_response = self._parse_data(response)
+                await self.async_update_data(parsed_response)
+            except Exception as err:
+                pending_response.set_exception(err)
+            else:
+                pending_response.set_result(parsed_response)
+            finally:
+                if not pending_response.done():
+                    pending_response.cancel()
+
+    async def _apply_optimistic(
+        self, writes: Mapping[Any, ComplexAction], request: Mapping[int, int]
+    ) -> dict[Any, tuple[int, Any]]:
+        """shows the values expected after the request to the listeners before it is sent,
+        returns the write sequence and the previous value of every applied key"""
+        expected_values = dict(self._raw_values)
+        expected_values.update(request)
+        previous_data = self.data or {}
+        applied = {}
+        for key, action in writes.items():
+            if any(param not in expected_values for param in action.parameters):
+                continue
+            self._write_sequence += 1
+            self._optimistic[key] = (
+                self._write_sequence,
+                action.response_parser(expected_values),
+            )
+            applied[key] = (self._write_sequence, previous_data.get(key))
+        if applied:
+            await self.async_update_data(
+                {key: self._optimistic[key][1] for key in applied}
+            )
+        return applied
+
+    async def _reconcile(
+        self, applied: Mapping[Any, tuple[int, Any]], response: Mapping[Any, Any] | None
+    ) -> None:
+        """compares optimistic values with the device response, unconfirmed values are rolled back
+        keys written again since then are left to the newer write"""
+        rollback = {}
+        for key, (sequence, previous) in applied.items():
+            latest = self._optimistic.get(key)
+            if latest is None or latest[0] != sequence:
+                continue
+            del self._optimistic[key]
+            if response is None or key not in response:
+                LOG.warning(
+                    "%s did not confirm %s=%s, rolling back to %s",
+                    self.name, key, latest[1], previous,
+                )
+                rollback[key] = previous
+            elif response[key] != latest[1]:
+                LOG.warning(
+                    "%s rejected %s=%s, it reports %s",
+                    self.name, key, latest[1], response[key],
+                )
+        if rollback:
+            await self.async_update_data(rollback)
+
+    async def _do_request(
+        self, writes: Mapping[Any, ComplexAction], request: Mapping[int, int]
     ):
-        request = action.request_parser(value)
         if len(request) > 0:
-            response = self._blauberg_protocol.write_params(request)
-            await self.async_update_data(self._parse_data(response))
+            applied = await self._apply_optimistic(writes, request)
+            try:
+                response = await self._async_write(request)
+            except BlaubergProtocolError as err:
+                await self._reconcile(applied, None)
+                raise UpdateFailed(f"Invalid response: {err}") from err
+            except BaseException:
+                await self._reconcile(applied, None)
+                raise
+            await self._reconcile(applied, response)
 
     async def set_power(self, power: bool):
         """Turns the fan off or on"""
-        param_action = self._get_device_action(Purpose.POWER)
-        await self._do_action(power, param_action)
+        await self.set_values({Purpose.POWER: power})
 
     async def set_speed(self, percentage: int):
         """Sets the fans speed by percentage"""
-        param_action = self._get_device_action(Purpose.FAN_SPEED)
-        await self._do_action(percentage, param_action)
+        await self.set_values({Purpose.FAN_SPEED: percentage})
 
     async def set_preset(self, preset: str):
         """Sets the fan preset"""
-        param_action = self._get_device_action(Purpose.PRESET)
-        await self._do_action(preset, param_action)
+        await self.set_values({Purpose.PRESET: preset})
 
     async def set_optional_param(self, name: str, value: str | float | bool):
         """Sets the fan preset"""
-        param_action = self._get_extra_device_action(name)
-        await self._do_action(value, param_action)
+        await self.set_values({name: value})
+
+    async def set_values(
+        self, values: Mapping[Purpose | str, float | str | int | bool | None]
+    ):
+        """Sets values of purposes and optional parameters by name in a single frame,
+        raises WriteConflictError if they require different values for the same parameter"""
+        request: dict[int, int] = {}
+        writers: dict[int, Purpose | str] = {}
+        writes: dict[Purpose | str, ComplexAction] = {}
+        for key, value in values.items():
+            if isinstance(key, Purpose):
+                param_action = self._get_device_action(key)
+            else:
+                param_action = self._get_extra_device_action(key)
+            writes[key] = param_action
+            for param, param_value in param_action.request_parser(value).items():
+                if param in request and request[param] != param_value:
+                    raise WriteConflictError(
+                        f"{writers[param]} and {key} set parameter {param:#04x} to different values"
+                    )
+                request[param] = param_value
+                writers[param] = key
+        await self._do_request(writes, request)
 
     @property
     def device_info(self) -> DeviceInfo | None:
@@ -1,2 +1,11 @@
 # __init__.py
 from .blauberg_protocol import BlaubergProtocol as BlaubergProtocol
+from .blauberg_protocol import PreparedRead as PreparedRead
+from .blauberg_protocol import DeviceIdentity as DeviceIdentity
+from .blauberg_transport import BlaubergTransport as BlaubergTransport
+from .blauberg_stats import BlaubergStats as BlaubergStats
+from .blauberg_tracing import Tracer as Tracer
+from .blauberg_tracing import set_tracer as set_tracer
+from .errors import BlaubergProtocolError as BlaubergProtocolError
+from .errors import BlaubergFrameError as BlaubergFrameError
+from .errors import BlaubergChecksumError as BlaubergChecksumError
@@ -1,15 +1,100 @@
 from __future__ import annotations
-from collections.abc import Mapping
-from ezpacket import Packet, Section, ExpandingSection, DynamicSection
+from collections.abc import (
+    AsyncIterator,
+    Collection,
+    Iterable,
+    Mapping,
+    MutableMapping,
+    Sequence,
+)
+from ezpacket import Packet, Section, DynamicSection
+from typing import NamedTuple, TypeVar, overload
+import asyncio
+import random
 import socket
+import time
 import ifaddr
+from .blauberg_transport import BlaubergTransport
+from .blauberg_stats import BlaubergStats
+from . import blauberg_tracing
+from .errors import BlaubergFrameError, BlaubergChecksumError
 from ipaddress import IPv4Network
 
 import logging
 
 LOG = logging.getLogger(__name__)
 
-BUFFER_SIZE = 4096
+# largest UDP datagram, responses are never truncated by the receive call.
+# Responses are received into a buffer allocated once and only their actual size is copied
+BUFFER_SIZE = 65535
+# estimated response size of a single parameter: dynamic value indicator, length, tail and a 2 byte value
+RESPONSE_PARAM_SIZE = 5
+# interfaces are checked for changes on every broadcast, addresses are scanned again at least this often (seconds)
+# since an interface can change its address without the interface set changing
+BROADCAST_CACHE_TTL = 300
+
+_Values = TypeVar("_Values", bound=MutableMapping[int, "int | None"])
+
+
+class BlaubergFrame(NamedTuple):
+    """represents a validated frame received from a device, data is a view on the received bytes"""
+
+    device_id: str
+    password: str
+    function: int
+    data: memoryview
+
+
+class PreparedRead(NamedTuple):
+    """represents a read request which is encoded once and replayed on every read,
+    it is bound to the device id and password of the protocol that prepared it.
+    Parameters that don't fit in a single frame are split into multiple commands"""
+
+    parameters: tuple[int, ...]
+    commands: tuple[bytes, ...]
+
+
+class DeviceIdentity(NamedTuple):
+    """identity of a device, password_valid tells if the device answers with the given password"""
+
+    device_id: str
+    device_type: int
+    firmware: int
+    password_valid: bool
+
+
+class _BlaubergDatagramProtocol(asyncio.DatagramProtocol):
+    """Datagram protocol resolving a future with the first response received on the endpoint"""
+
+    def __init__(self) -> None:
+        self.response: asyncio.Future[bytes] = (
+            asyncio.get_running_loop().create_future()
+        )
+
+    def datagram_received(self, data: bytes, addr: tuple[str, int]) -> None:
+        if not self.response.done():
+            self.response.set_result(data)
+
+    def error_received(self, exc: Exception) -> None:
+        if not self.response.done():
+            self.response.set_exception(exc)
+
+    def connection_lost(self, exc: Exception | None) -> None:
+        if not self.response.done():
+            self.response.set_exception(exc or ConnectionError("connection lost"))
+
+
+class _BlaubergDiscoveryProtocol(asyncio.DatagramProtocol):
+    """Datagram protocol queueing every response received on the discovery endpoint with its source address"""
+
+    def __init__(self, responses: asyncio.Queue) -> None:
+        self._responses = responses
+
+    def datagram_received(self, data: bytes, addr: tuple[str, int]) -> None:
+        self._responses.put_nowait((data, addr))
+
+    def error_received(self, exc: Exception) -> None:
+        LOG.debug("discovery error: %s", exc)
 
 
 class BlaubergProtocol:
@@ -21,12 +106,40 @@ class BlaubergProtocol:
     LEAD_INDICATOR = Section(0xFF)
     INVALID = Section(0xFD)
     DYNAMIC_VAL = Section(0xFE)
-    BLANK_BYTE = ExpandingSection()
 
     DEFAULT_PORT = 4000
     DEFAULT_TIMEOUT = 1
     DEFAULT_PWD = "1111"
     DEFAULT_DEVICE_ID = "DEFAULT_DEVICEID"
+    DEFAULT_QUIET_PERIOD = 0.3
+    # bytes of a request or response data block devices are assumed to handle in a single frame
+    DEFAULT_MAX_PAYLOAD = 256
+    # lost frames are sent again up to DEFAULT_RETRIES times,
+    # waiting up to DEFAULT_BACKOFF seconds doubled on every retry
+    DEFAULT_RETRIES = 2
+    DEFAULT_BACKOFF = 0.1
+    # consecutive failed requests after which only probes are sent until the device answers again
+    DEFAULT_FAILURE_THRESHOLD = 3
+    # frames sent to check a password of a device which answered in discovery mode,
+    # one lost frame must not make a correct password look wrong
+    PASSWORD_CHECK_ATTEMPTS = 2
+    # bounds of the timeout calculated from the measured round trip times
+    MIN_TIMEOUT = 0.1
+    MAX_TIMEOUT = 5.0
+    # gains and variance factor of the round trip time estimate, the same as TCP's (RFC 6298)
+    RTT_ALPHA = 1 / 8
+    RTT_BETA = 1 / 4
+    RTT_K = 4
+    FIRMWARE_PARAM = 0x86
+    DEVICE_TYPE_PARAM = 0xB9
+    # requests per second and hosts waited for at once while sweeping a network,
+    # the window needs to cover rate * timeout to keep the rate when most hosts don't answer
+    DEFAULT_SWEEP_RATE = 500
+    DEFAULT_SWEEP_WINDOW = 512
+
+    _adapter_cache: list[tuple[str, str, list[str]]] = []
+    _adapter_cache_key: tuple[tuple[int, str], ...] | None = None
+    _adapter_cache_time = 0.0
 
     class FUNC:
         Template = Section.Template(1)
@@ -34,10 +147,28 @@ class BlaubergProtocol:
         RW = Section(0x03)
 
     @staticmethod
-    def _broadcast_addresses() -> list[str]:
-        nets = []
-        adapters = ifaddr.get_adapters()
-        for adapter in adapters:
+    def _interfaces_key() -> tuple[tuple[int, str], ...] | None:
+        """cheap snapshot of the host's interfaces to detect changes, None if it is not supported"""
+        try:
+            return tuple(socket.if_nameindex())
+        except (AttributeError, OSError):
+            return None
+
+    @staticmethod
+    def _adapter_broadcast_addresses() -> list[tuple[str, str, list[str]]]:
+        """returns adapter names, nice names and broadcast addresses of private networks,
+        the adapters are only scanned again when the interfaces change or the cache expires"""
+        key = BlaubergProtocol._interfaces_key()
+        now = time.monotonic()
+        if (
+            key is not None
+            and key == BlaubergProtocol._adapter_cache_key
+            and now - BlaubergProtocol._adapter_cache_time < BROADCAST_CACHE_TTL
+        ):
+            return BlaubergProtocol._adapter_cache
+        adapter_nets = []
+        for adapter in ifaddr.get_adapters():
+            nets = []
             for ip in adapter.ips:
                 if ip.is_IPv4 and ip.network_prefix < 32:
                     localNet = IPv4Network(f"{ip.ip}/{ip.network_prefix}", strict=False)
@@ -47,16 +178,32 @@ class BlaubergProtocol:
                         and not localNet.is_link_local
                     ):
                         nets.append(str(localNet.broadcast_address))
+            if nets:
+                adapter_nets.append((adapter.name, adapter.nice_name, nets))
+        BlaubergProtocol._adapter_cache = adapter_nets
+        BlaubergProtocol._adapter_cache_key = key
+        BlaubergProtocol._adapter_cache_time = now
+        return adapter_nets
+
+    @staticmethod
+    def _broadcast_addresses(interfaces: Collection[str] | None = None) -> list[str]:
+        """broadcast addresses of the host's private networks, limited to the given interface names if any"""
+        nets = []
+        for name, nice_name, broadcasts in BlaubergProtocol._adapter_broadcast_addresses():
+            if interfaces is None or name in interfaces or nice_name in interfaces:
+                nets.extend(broadcasts)
         return nets
 
     @staticmethod
-    def _broadcast(port: int, timeout: float, data: bytes) -> list[tuple[bytes, str]]:
-        destinations = BlaubergProtocol._broadcast_addresses()
+    def _broadcast(
+        port: int,
+        timeout: float,
+        data: bytes,
+        interfaces: Collection[str] | None = None,
+    ) -> list[tuple[bytes, str]]:
+        destinations = BlaubergProtocol._broadcast_addresses(interfaces)
         LOG.debug(
-            "broadcasting: %s to: %s with port: %s",
-            str(data),
-            str(destinations),
-            str(port),
+            "broadcasting: %s to: %s with port: %s", data, destinations, port
         )
         s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         s.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
@@ -64,13 +211,15 @@ class BlaubergProtocol:
         for dest in destinations:
             s.sendto(data, (dest, port))
         responses = []
+        buffer = bytearray(BUFFER_SIZE)
         timeout = False
         while not timeout:
             try:
-                responses.append(s.recvfrom(BUFFER_SIZE))
+                (size, address) = s.recvfrom_into(buffer)
+                responses.append((bytes(buffer[:size]), address))
             except socket.timeout:
                 timeout = True
-        LOG.debug("responses: %s", str(responses))
+        LOG.debug("responses: %s", responses)
         return responses
 
     @staticmethod
@@ -86,71 +235,364 @@ class BlaubergProtocol:
         )
         # Complex blocks with lead indicator or dynamic values are not supported in discovery mode on the device
         # hence we need to use a simpler command to get device id
-        data_response = temp_protocol._communicate_block(
-            temp_protocol.FUNC.R, Packet([Section(device_id_param)])
+        try:
+            data_response = temp_protocol._communicate_block(
+                temp_protocol.FUNC.R, Packet([Section(device_id_param)])
+            )
+        except BlaubergFrameError as err:
+            LOG.info("invalid response from %s: %s", host, err)
+            return None
+        discovered = temp_protocol._discovered_device_id(data_response, device_id_param)
+        if discovered is None:
+            return None
+        temp_protocol._set_credentials(discovered[0], password)
+        return temp_protocol
+
+    @staticmethod
+    async def async_discover_device(
+        host: str,
+        port: int = DEFAULT_PORT,
+        password: str = DEFAULT_PWD,
+        timeout: float = DEFAULT_TIMEOUT,
+        device_id_param: int = 0x7C,
+        transport: BlaubergTransport | None = None,
+    ) -> BlaubergProtocol | None:
+        temp_protocol = BlaubergProtocol(
+            host=host, port=port, timeout=timeout, password="", transport=transport
         )
-        if data_response == temp_protocol.BLANK_BYTE:
+        # Complex blocks with lead indicator or dynamic values are not supported in discovery mode on the device
+        # hence we need to use a simpler command to get device id
+        try:
+            data_response = await temp_protocol._async_communicate_block(
+                temp_protocol.FUNC.R, Packet([Section(device_id_param)])
+            )
+        except BlaubergFrameError as err:
+            LOG.info("invalid response from %s: %s", host, err)
             return None
-        params = temp_protocol._decode_data(data_response.to_bytes())
-        raw_device_id = params.get(device_id_param)
-        if raw_device_id is None or raw_device_id == 0:
+        discovered = temp_protocol._discovered_device_id(data_response, device_id_param)
+        if discovered is None:
             return None
-        device_id = Section(raw_device_id).to_bytes().decode()
-        temp_protocol._device_id = device_id
-        temp_protocol._password = password
+        temp_protocol._set_credentials(discovered[0], password)
         return temp_protocol
 
+    @staticmethod
+    async def async_identify(
+        host: str,
+        port: int = DEFAULT_PORT,
+        password: str = DEFAULT_PWD,
+        device_id: str | None = None,
+        timeout: float = DEFAULT_TIMEOUT,
+        device_id_param: int = 0x7C,
+        transport: BlaubergTransport | None = None,
+    ) -> DeviceIdentity | None:
+        """reads device id, type and firmware and checks the password in as few frames as possible,
+        with a known device id a single authenticated frame is enough, otherwise the identity is read in discovery mode
+        and the password is checked with a second frame. Returns None if the device doesn't answer"""
+        # simple blocks only, discovery mode doesn't support lead indicators or dynamic values
+        identity_block = Packet(
+            [
+                Section(device_id_param),
+                Section(BlaubergProtocol.FIRMWARE_PARAM),
+                Section(BlaubergProtocol.DEVICE_TYPE_PARAM),
+            ]
+        )
+        if device_id is not None:
+            # devices don't answer wrong passwords, retrying would only delay the discovery mode read
+            device = BlaubergProtocol(
+                host, port, device_id, password, timeout, transport, retries=0
+            )
+            values = device._decode_data(
+                await device._async_communicate_block(device.FUNC.R, identity_block)
+            )
+            if values:
+                return DeviceIdentity(
+                    device_id,
+                    values.get(BlaubergProtocol.DEVICE_TYPE_PARAM) or 0,
+                    values.get(BlaubergProtocol.FIRMWARE_PARAM) or 0,
+                    True,
+                )
+            # devices don't answer wrong credentials, discovery mode tells them apart from unreachable devices.
+            # The frame may also have been lost, the password is checked again once the device is known to answer
+
+        temp_protocol = BlaubergProtocol(
+            host=host, port=port, timeout=timeout, password="", transport=transport
+        )
+        data_response = await temp_protocol._async_communicate_block(
+            temp_protocol.FUNC.R, identity_block
+        )
+        discovered = temp_protocol._discovered_device_id(data_response, device_id_param)
+        if discovered is None:
+            return None
+        values = temp_protocol._decode_data(data_response)
+        (discovered_id, raw_device_id) = discovered
+        password_valid = await BlaubergProtocol._async_check_password(
+            BlaubergProtocol(host, port, discovered_id, password, timeout, transport),
+            device_id_param,
+            raw_device_id,
+        )
+        return DeviceIdentity(
+            discovered_id,
+            values.get(BlaubergProtocol.DEVICE_TYPE_PARAM) or 0,
+            values.get(BlaubergProtocol.FIRMWARE_PARAM) or 0,
+            password_valid,
+        )
+
+    @staticmethod
+    async def _async_check_password(
+        device: BlaubergProtocol, device_id_param: int, raw_device_id: int
+    ) -> bool:
+        """devices only answer frames with their password, the device id read with it has to match the discovered one.
+        The device answered in discovery mode, silence is most likely a wrong password.
+        The read is sent PASSWORD_CHECK_ATTEMPTS times instead of using the retries of the device"""
+        command = bytes(
+            device._construct_command(
+                device.FUNC.R,
+                device._construct_command_block({device_id_param: None}).to_bytes(),
+            )
+        )
+        try:
+            response = None
+            for attempt in range(BlaubergProtocol.PASSWORD_CHECK_ATTEMPTS):
+                if attempt:
+                    await asyncio.sleep(device._retry_delay(attempt))
+                response = await device._async_attempt(command, attempt == 0)
+                if response is not None:
+                    break
+            values = device._decode_data(device._decode_response(response or bytes()))
+            verified = values.get(device_id_param) == raw_device_id
+        except BlaubergFrameError as err:
+            LOG.info("invalid response from %s: %s", device.host, err)
+            return False
+        if not verified:
+            LOG.info("invalid device id response after discovery, check password")
+        return verified
+
     @staticmethod
     def discover(
         port: int = DEFAULT_PORT,
         password: str = DEFAULT_PWD,
         timeout: float = DEFAULT_TIMEOUT,
         device_id_param: int = 0x7C,
+        interfaces: Collection[str] | None = None,
     ) -> list[BlaubergProtocol]:
         temp_protocol = BlaubergProtocol("")
         # Complex blocks with lead indicator or dynamic values are not supported in discovery mode on the device
         # hence we need to use a simpler command to get device id
         discover_command = temp_protocol._construct_command(
-            temp_protocol.FUNC.R, Packet([Section(device_id_param)])
+            temp_protocol.FUNC.R, Section(device_id_param).to_bytes()
+        )
+        responses = temp_protocol._broadcast(
+            port, timeout, discover_command, interfaces
         )
-        responses = temp_protocol._broadcast(port, timeout, discover_command.to_bytes())
         discoverd = []
         for resp in responses:
             (raw_response, (host, _)) = resp
-            LOG.debug("received raw response: %s from %s", str(raw_response), host)
+            LOG.debug("received raw response: %s from %s", raw_response, host)
             if len(raw_response) != 0:
-                # Exclude checksum due to data section being expandible
-                response = temp_protocol._response().decode(raw_response[:-2])
-                LOG.debug("parsed raw response: %s", str(response))
-
-                actual_check_sum = temp_protocol.CHECKSUM.set_bytes(
-                    raw_response[-2:]
-                ).value
-                expected_check_sum = temp_protocol._checksum(
-                    Packet(response[1:-1])
-                ).value
-                if actual_check_sum == expected_check_sum:
-                    data_block = response[-2]
-                    params = temp_protocol._decode_data(data_block.to_bytes())
-                    raw_device_id = params.get(device_id_param)
-                    if raw_device_id is not None and raw_device_id != 0:
-                        device_id = Section(raw_device_id).to_bytes().decode()
-                        device = BlaubergProtocol(
-                            host, port, device_id, password, timeout
+                try:
+                    frame = temp_protocol._parse_frame(raw_response)
+                except BlaubergFrameError as err:
+                    LOG.info("invalid response from %s: %s", host, err)
+                    continue
+                discovered = temp_protocol._discovered_device_id(
+                    frame.data, device_id_param
+                )
+                if discovered is not None:
+                    (device_id, raw_device_id) = discovered
+                    device = BlaubergProtocol(host, port, device_id, password, timeout)
+                    try:
+                        verified = device.read_param(device_id_param) == raw_device_id
+                    except BlaubergFrameError as err:
+                        LOG.info("invalid response from %s: %s", host, err)
+                        continue
+                    if verified:
+                        discoverd.append(device)
+                    else:
+                        LOG.info(
+                            "invalid device id response after discovery, check password"
                         )
-                        if device.read_param(device_id_param) == raw_device_id:
-                            discoverd.append(device)
-                        else:
-                            LOG.info(
-                                "invalid device id response after discovery, check password"
-                            )
+        return discoverd
+
+    @staticmethod
+    async def async_discover(
+        port: int = DEFAULT_PORT,
+        password: str = DEFAULT_PWD,
+        timeout: float = DEFAULT_TIMEOUT,
+        device_id_param: int = 0x7C,
+        quiet_period: float = DEFAULT_QUIET_PERIOD,
+        transport: BlaubergTransport | None = None,
+        interfaces: Collection[str] | None = None,
+    ) -> AsyncIterator[BlaubergProtocol]:
+        """broadcasts a discovery request and yields devices as soon as their password is verified,
+        responders are verified in parallel while listening, listening ends after timeout
+        or earlier when no new response arrives for the quiet period after the first response"""
+        async for device in BlaubergProtocol._async_probe(
+            BlaubergProtocol._broadcast_addresses(interfaces),
+            port,
+            password,
+            timeout,
+            device_id_param,
+            transport,
+            quiet_period=quiet_period,
+        ):
+            yield device
+
+    @staticmethod
+    async def async_sweep(
+        network: str | IPv4Network,
+        port: int = DEFAULT_PORT,
+        password: str = DEFAULT_PWD,
+        timeout: float = DEFAULT_TIMEOUT,
+        device_id_param: int = 0x7C,
+        rate: float = DEFAULT_SWEEP_RATE,
+        window: int = DEFAULT_SWEEP_WINDOW,
+        transport: BlaubergTransport | None = None,
+    ) -> AsyncIterator[BlaubergProtocol]:
+        """sends the discovery request to every host of the network one by one for networks which drop broadcasts,
+        at most rate requests are sent per second and at most window hosts are waited for at once,
+        a host is waited for until it answers or the timeout passes"""
+        async for device in BlaubergProtocol._async_probe(
+            (str(host) for host in IPv4Network(network, strict=False).hosts()),
+            port,
+            password,
+            timeout,
+            device_id_param,
+            transport,
+            rate=rate,
+            window=window,
+        ):
+            yield device
+
+    @staticmethod
+    async def _async_probe(
+        destinations: Iterable[str],
+        port: int,
+        password: str,
+        timeout: float,
+        device_id_param: int,
+        transport: BlaubergTransport | None,
+        quiet_period: float | None = None,
+        rate: float | None = None,
+        window: int | None = None,
+    ) -> AsyncIterator[BlaubergProtocol]:
+        """sends the discovery request to destinations from a single endpoint and yields verified responders"""
+        temp_protocol = BlaubergProtocol("")
+        # Complex blocks with lead indicator or dynamic values are not supported in discovery mode on the device
+        # hence we need to use a simpler command to get device id
+        discover_command = temp_protocol._construct_command(
+            temp_protocol.FUNC.R, Section(device_id_param).to_bytes()
+        )
+
+        loop = asyncio.get_running_loop()
+        events: asyncio.Queue[
+            tuple[bytes, tuple[str, int]] | BlaubergProtocol | bool | None
+        ] = asyncio.Queue()
+        endpoint, _ = await loop.create_datagram_endpoint(
+            lambda: _BlaubergDiscoveryProtocol(events),
+            local_addr=("0.0.0.0", 0),
+            allow_broadcast=True,
+        )
+        checks: set[asyncio.Task[None]] = set()
+        slots = asyncio.Semaphore(window) if window is not None else None
+        # destinations which haven't answered yet while they hold a slot of the window
+        in_flight: dict[str, asyncio.TimerHandle] = {}
+
+        def release(host: str) -> None:
+            handle = in_flight.pop(host, None)
+            if handle is not None:
+                handle.cancel()
+            if handle is not None and slots is not None:
+                slots.release()
+
+        async def send() -> None:
+            try:
+                await send_all()
+            finally:
+                # marks the end of listening, also when sending failed
+                events.put_nowait(False)
+
+        async def send_all() -> None:
+            interval = 1 / rate if rate else 0
+            next_send = loop.time()
+            for dest in destinations:
+                if slots is not None:
+                    await slots.acquire()
+                    in_flight[dest] = loop.call_later(timeout, release, dest)
+                if interval:
+                    delay = next_send - loop.time()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    # catch up with oversleeping but don't burst after waiting for the window
+                    next_send = max(next_send, loop.time() - interval) + interval
+                LOG.debug("sending: %s to: %s with port: %s", discover_command, dest, port)
+                endpoint.sendto(discover_command, (dest, port))
+            if slots is not None:
+                for _ in range(window):
+                    await slots.acquire()
+            else:
+                await asyncio.sleep(timeout)
+
+        async def check(host: str, device_id: str, raw_device_id: int) -> None:
+            device = BlaubergProtocol(host, port, device_id, password, timeout, transport)
+            verified = await BlaubergProtocol._async_check_password(
+                device, device_id_param, raw_device_id
+            )
+            events.put_nowait(device if verified else None)
+
+        sender = loop.create_task(send())
+        try:
+            # the quiet period starts with the first response, slow devices get the whole timeout to answer
+            last_response: float | None = None
+            listening = True
+            seen: set[tuple[str, str]] = set()
+            # verifications which haven't reported their result yet
+            pending = 0
+            while listening or pending:
+                if listening and quiet_period is not None and last_response is not None:
+                    wait = last_response + quiet_period - loop.time()
+                    try:
+                        event = await asyncio.wait_for(events.get(), max(wait, 0))
+                    except asyncio.TimeoutError:
+                        event = False
                 else:
-                    LOG.info(
-                        "invalid checksum response: expected: %s, actual: %s",
-                        str(expected_check_sum),
-                        str(actual_check_sum),
+                    event = await events.get()
+
+                if event is False:
+                    if sender.done() and sender.exception() is not None:
+                        raise sender.exception()
+                    listening = False
+                    endpoint.close()
+                elif isinstance(event, tuple):
+                    last_response = loop.time()
+                    (raw_response, (host, _)) = event
+                    LOG.debug("received raw response: %s from %s", raw_response, host)
+                    release(host)
+                    try:
+                        frame = temp_protocol._parse_frame(raw_response)
+                    except BlaubergFrameError as err:
+                        LOG.info("invalid response from %s: %s", host, err)
+                        continue
+                    discovered = temp_protocol._discovered_device_id(
+                        frame.data, device_id_param
                     )
-        return discoverd
+                    if discovered is None or (host, discovered[0]) in seen:
+                        continue
+                    seen.add((host, discovered[0]))
+                    task = loop.create_task(check(host, *discovered))
+                    checks.add(task)
+                    task.add_done_callback(checks.discard)
+                    pending += 1
+                else:
+                    pending -= 1
+                    if event is not None:
+                        yield event
+        finally:
+            endpoint.close()
+            sender.cancel()
+            for handle in in_flight.values():
+                handle.cancel()
+            for task in checks:
+                task.cancel()
 
     def __init__(
         self,
@@ -159,6 +601,11 @@ class BlaubergProtocol:
         device_id: str = DEFAULT_DEVICE_ID,
         password: str = DEFAULT_PWD,
         timeout: float = DEFAULT_TIMEOUT,
+        transport: BlaubergTransport | None = None,
+        max_payload: int = DEFAULT_MAX_PAYLOAD,
+        retries: int = DEFAULT_RETRIES,
+        backoff: float = DEFAULT_BACKOFF,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
     ) -> None:
         if port <= 0:
             raise ValueError("port can not be less than or equal to zero")
@@ -166,11 +613,35 @@ class BlaubergProtocol:
             raise ValueError("device id can not be blank")
         if timeout <= 0:
             raise ValueError("timeout can not be less than or equal to zero")
+        if max_payload < 2 + RESPONSE_PARAM_SIZE:
+            raise ValueError("max payload can not be smaller than a single parameter")
+        if retries < 0:
+            raise ValueError("retries can not be less than zero")
+        if backoff < 0:
+            raise ValueError("backoff can not be less than zero")
+        if failure_threshold <= 0:
+            raise ValueError("failure threshold can not be less than or equal to zero")
+        self._max_payload = max_payload
+        self._retries = retries
+        self._backoff = backoff
+        self._failure_threshold = failure_threshold
+        # consecutive requests the device didn't answer, even after retries
+        self._failures = 0
+        # one probe at a time while the circuit is open, the others use its outcome
+        self._probe_lock = asyncio.Lock()
+        self._probes = 0
         self._host = host
         self._port = port
-        self._device_id = device_id
-        self._password = password
         self._timeout = timeout
+        # smoothed round trip time and its variation in seconds, None until the first response
+        self._srtt: float | None = None
+        self._rttvar = 0.0
+        self._rto = timeout
+        self._stats = BlaubergStats()
+        # receive buffer of the blocking api, allocated on its first use
+        self._receive_buffer: bytearray | None = None
+        self._transport = transport
+        self._set_credentials(device_id, password)
 
     @property
     def device_id(self):
@@ -188,30 +659,71 @@ class BlaubergProtocol:
     def password(self):
         return self._password
 
-    def _protocol(self) -> Packet:
-        return Packet(
+    def _set_credentials(self, device_id: str, password: str) -> None:
+        """sets device id and password and precompiles the fixed part of the command frames"""
+        self._device_id = device_id
+        self._password = password
+        self._command_prefix = Packet(
             [
                 self.HEADER,
                 self.PROTOCOL_TYPE,
-                DynamicSection().set_bytes(bytes(self._device_id, "utf-8")),
-                DynamicSection().set_bytes(bytes(self._password, "utf-8")),
-                self.FUNC.Template,
-                ExpandingSection(),
-                self.CHECKSUM,
+                DynamicSection().set_bytes(bytes(device_id, "utf-8")),
+                DynamicSection().set_bytes(bytes(password, "utf-8")),
             ]
+        ).to_bytes()
+        # header is not included in the checksum
+        self._command_prefix_checksum = sum(self._command_prefix) - sum(
+            self.HEADER.to_bytes()
         )
 
-    def _response(self) -> Packet:
-        return Packet(
-            [
-                self.HEADER,
-                self.PROTOCOL_TYPE,
-                DynamicSection(),
-                DynamicSection(),
-                self.FUNC.Template,
-                ExpandingSection(),
-                self.CHECKSUM,
-            ]
+    @staticmethod
+    def _discovered_device_id(
+        data: bytes | memoryview, device_id_param: int
+    ) -> tuple[str, int] | None:
+        """returns the device id as text and as the raw parameter value from a discovery response data block"""
+        raw_device_id = BlaubergProtocol._decode_data(data).get(device_id_param)
+        if raw_device_id is None or raw_device_id == 0:
+            return None
+        return Section(raw_device_id).to_bytes().decode(), raw_device_id
+
+    @staticmethod
+    def _parse_frame(raw_frame: bytes | bytearray | memoryview) -> BlaubergFrame:
+        """validates and splits a received frame in a single pass, the checksum is accumulated while walking the sections
+        raises BlaubergFrameError for malformed frames and BlaubergChecksumError if the checksum doesn't match
+        """
+        frame = memoryview(raw_frame)
+        # checksum bytes are at the end, function byte is the last byte before the data block
+        end = len(frame) - BlaubergProtocol.CHECKSUM.byte_size
+        header = BlaubergProtocol.HEADER.value
+        if end < 6:
+            raise BlaubergFrameError("frame is too short: %d bytes" % len(frame))
+        if frame[0] != header >> 8 or frame[1] != header & 0xFF:
+            raise BlaubergFrameError("invalid header: %s" % frame[0:2].hex())
+        if frame[2] != BlaubergProtocol.PROTOCOL_TYPE.value:
+            raise BlaubergFrameError("invalid protocol type: %d" % frame[2])
+        # header is not included in the checksum
+        check_sum = frame[2]
+        index = 3
+        sections = []
+        for _ in range(2):
+            section_end = index + 1 + frame[index]
+            if section_end >= end:
+                raise BlaubergFrameError("section length exceeds the frame")
+            check_sum += sum(frame[index:section_end])
+            sections.append(frame[index + 1 : section_end])
+            index = section_end
+        check_sum += sum(frame[index:end])
+        actual_check_sum = frame[end] | frame[end + 1] << 8
+        if actual_check_sum != check_sum & 0xFFFF:
+            raise BlaubergChecksumError(
+                "invalid checksum: expected: %d actual: %d"
+                % (check_sum & 0xFFFF, actual_check_sum)
+            )
+        return BlaubergFrame(
+            device_id=bytes(sections[0]).decode(errors="replace"),
+            password=bytes(sections[1]).decode(errors="replace"),
+            function=frame[index],
+            data=frame[index + 1 : end],
         )
 
     @staticmethod
@@ -221,107 +733,292 @@ class BlaubergProtocol:
         conn.connect((host, port))
         return conn
 
+    @property
+    def circuit_open(self) -> bool:
+        """True while the device doesn't answer, requests are only sent after it answers a probe"""
+        return self._failures >= self._failure_threshold
+
+    @property
+    def stats(self) -> BlaubergStats:
+        return self._stats
+
+    @property
+    def timeout(self) -> float:
+        """seconds a single frame is waited for, calculated from the measured round trip times"""
+        return self._rto
+
+    @property
+    def rtt_estimate(self) -> tuple[float, float] | None:
+        """smoothed round trip time and its variation, None until the device answered once"""
+        if self._srtt is None:
+            return None
+        return (self._srtt, self._rttvar)
+
+    def restore_rtt_estimate(self, srtt: float, rttvar: float) -> None:
+        """continues with a previously measured estimate, e.g. after a restart"""
+        self._srtt = srtt
+        self._rttvar = rttvar
+        self._update_rto()
+
+    def _update_rto(self) -> None:
+        if self._srtt is None:
+            return
+        self._rto = min(
+            max(self._srtt + self.RTT_K * self._rttvar, self.MIN_TIMEOUT),
+            self.MAX_TIMEOUT,
+        )
+
+    def _sample_rtt(self, rtt: float) -> None:
+        if self._srtt is None:
+            self._srtt = rtt
+            self._rttvar = rtt / 2
+        else:
+            self._rttvar += self.RTT_BETA * (abs(self._srtt - rtt) - self._rttvar)
+            self._srtt += self.RTT_ALPHA * (rtt - self._srtt)
+        self._update_rto()
+
+    @property
+    def request_deadline(self) -> float:
+        """longest time a single request can take with its retries, backoffs and the probe of an open circuit"""
+        deadline = self._backoff * (2**self._retries - 1)
+        timeout = self._rto
+        for _ in range(self._retries + 2):
+            deadline += timeout
+            timeout = min(timeout * 2, self.MAX_TIMEOUT)
+        return deadline
+
+    def _retry_delay(self, attempt: int) -> float:
+        """exponential backoff with full jitter, devices losing frames at the same time don't retry in lockstep"""
+        return random.uniform(0, self._backoff * 2 ** (attempt - 1))
+
     def _communicate(self, data: bytes) -> bytes:
-        conn = self._connect(self._host, self._port, self._timeout)
-        conn.sendall(data)
-        response = bytes()
+        for attempt in range(self._retries + 1):
+            if attempt:
+                time.sleep(self._retry_delay(attempt))
+            conn = self._connect(self._host, self._port, self._rto)
+            tracer = blauberg_tracing.tracer
+            start = time.perf_counter() if tracer is not None else 0.0
+            conn.sendall(data)
+            self._stats.record_sent(len(data))
+            if self._receive_buffer is None:
+                self._receive_buffer = bytearray(BUFFER_SIZE)
+            try:
+                size = conn.recv_into(self._receive_buffer)
+                response = bytes(memoryview(self._receive_buffer)[:size])
+                self._stats.record_response(size)
+                return response
+            except socket.timeout:
+                self._stats.record_timeout()
+                LOG.debug("timeout of attempt %s", attempt + 1)
+            except ConnectionError:
+                LOG.debug("connection error on attempt %s", attempt + 1)
+            finally:
+                conn.close()
+                if tracer is not None:
+                    tracer(blauberg_tracing.NETWORK, start, time.perf_counter())
+        LOG.error("no response from %s after %s attempts", self._host, self._retries + 1)
+        return bytes()
+
+    async def _async_communicate(self, data: bytes) -> bytes:
+        """sends the data until the device answers or the retries run out,
+        after failure threshold failed requests only a single parameter is probed
+        on every request and the request fails without being sent until the device answers"""
+        if self.circuit_open:
+            probes = self._probes
+            async with self._probe_lock:
+                if self.circuit_open and probes == self._probes:
+                    probe = self.prepare_read([self.DEVICE_TYPE_PARAM]).commands[0]
+                    if await self._async_attempt(probe, True) is not None:
+                        LOG.info("%s answers again", self._host)
+                        self._failures = 0
+                    self._probes += 1
+            if self.circuit_open:
+                LOG.debug("%s doesn't answer, request is not sent", self._host)
+                return bytes()
+        for attempt in range(self._retries + 1):
+            if attempt:
+                await asyncio.sleep(self._retry_delay(attempt))
+            # responses to retries may belong to earlier attempts, only first attempts are measured
+            response = await self._async_attempt(data, attempt == 0)
+            if response is not None:
+                self._failures = 0
+                return response
+        self._failures += 1
+        if self._failures == self._failure_threshold:
+            LOG.warning(
+                "%s didn't answer %s requests, only probing it until it answers",
+                self._host,
+                self._failures,
+            )
+        else:
+            LOG.error("no response from %s after %s attempts", self._host, self._retries + 1)
+        return bytes()
+
+    async def _async_attempt(self, data: bytes, measure: bool = False) -> bytes | None:
+        """sends the data once, None if the device didn't answer in time.
+        Timeouts double the timeout until the next measured response"""
+        tracer = blauberg_tracing.tracer
+        start = time.monotonic()
+        trace_start = time.perf_counter() if tracer is not None else 0.0
+        self._stats.record_sent(len(data))
         try:
-            response = conn.recv(BUFFER_SIZE)
-        except socket.timeout:
-            LOG.error("timeout")
-        except ConnectionError:
-            LOG.error("Connection Error")
-        conn.close()
+            response = await asyncio.wait_for(self._async_exchange(data), self._rto)
+        except asyncio.TimeoutError:
+            self._stats.record_timeout()
+            LOG.debug("timeout after %s seconds", self._rto)
+            self._rto = min(self._rto * 2, self.MAX_TIMEOUT)
+            return None
+        except OSError as err:
+            LOG.debug("connection error: %s", err)
+            return None
+        finally:
+            if tracer is not None:
+                tracer(blauberg_tracing.NETWORK, trace_start, time.perf_counter())
+        if measure:
+            rtt = time.monotonic() - start
+            self._sample_rtt(rtt)
+            self._stats.record_response(len(response), rtt)
+        else:
+            self._stats.record_response(len(response))
         return response
 
+    async def _async_exchange(self, data: bytes) -> bytes:
+        if self._transport is not None:
+            # responses to the default device id carry the actual device id of the responder
+            device_id = (
+                None if self._device_id == self.DEFAULT_DEVICE_ID else self._device_id
+            )
+            return await self._transport.async_request(
+                self._host, self._port, device_id, data
+            )
+        loop = asyncio.get_running_loop()
+        transport, protocol = await loop.create_datagram_endpoint(
+            _BlaubergDatagramProtocol, remote_addr=(self._host, self._port)
+        )
+        try:
+            transport.sendto(data)
+            return await protocol.response
+        finally:
+            transport.close()
+
     @staticmethod
     def _swap_high_low(value: int, swap_size: int = 8) -> int:
         return value << swap_size & int(
             "1" * swap_size + "0" * swap_size, 2
         ) | value >> swap_size & int("0" * swap_size + "1" * swap_size, 2)
 
-    @staticmethod
-    def _checksum(data: Packet) -> Section:
-        check_sum = sum(data.to_bytes())
-        return Section(BlaubergProtocol._swap_high_low(check_sum), 2)
-
-    def _construct_command(self, function: Section, data: Packet) -> Packet:
-        LOG.debug(
-            "constructing command from function: %s data packet: %s",
-            str(function),
-            str(data),
-        )
-        command = self._protocol()
-        command[-3] = function
-        command[-2] = Section(data.to_int(), data.byte_size())
-        command[-1] = self._checksum(Packet(command[1:-1]))
+    def _construct_command(self, function: Section, data: bytes) -> bytearray:
+        tracer = blauberg_tracing.tracer
+        start = time.perf_counter() if tracer is not None else 0.0
+        prefix_size = len(self._command_prefix)
+        command = bytearray(prefix_size + 1 + len(data) + self.CHECKSUM.byte_size)
+        command[0:prefix_size] = self._command_prefix
+        command[prefix_size] = function.value
+        command[prefix_size + 1 : -2] = data
+        # checksum is the sum of bytes after the header with high and low bytes swapped
+        check_sum = self._command_prefix_checksum + function.value + sum(data)
+        command[-2] = check_sum & 0xFF
+        command[-1] = check_sum >> 8 & 0xFF
+        if tracer is not None:
+            tracer(blauberg_tracing.ENCODE, start, time.perf_counter())
         return command
 
-    def _communicate_block(self, function: Section, data: Packet) -> Section:
-        command = self._construct_command(function, data)
+    def _communicate_block(self, function: Section, data: Packet) -> memoryview:
+        command = self._construct_command(function, data.to_bytes())
+
+        LOG.debug("sending command: %s", command)
+        raw_response = self._communicate(command)
+        return self._decode_response(raw_response)
 
-        LOG.debug("sending command: %s", str(command))
-        raw_response = self._communicate(command.to_bytes())
-        LOG.debug("received raw response: %s", str(raw_response))
+    async def _async_communicate_block(
+        self, function: Section, data: Packet
+    ) -> memoryview:
+        command = self._construct_command(function, data.to_bytes())
+
+        LOG.debug("sending command: %s", command)
+        raw_response = await self._async_communicate(command)
+        return self._decode_response(raw_response)
+
+    def _decode_response(self, raw_response: bytes) -> memoryview:
+        LOG.debug("received raw response: %s", raw_response)
         if len(raw_response) == 0:
-            return self.BLANK_BYTE
-
-        # Exclude checksum due to data section being expandible
-        response = self._response().decode(raw_response[:-2])
-        LOG.debug("parsed raw response: %s", str(response))
-
-        actual_check_sum = self.CHECKSUM.set_bytes(raw_response[-2:]).value
-        expected_check_sum = self._checksum(Packet(response[1:-1])).value
-        if actual_check_sum != expected_check_sum:
-            LOG.debug(
-                "invalid checksum response: expected: %s actual: %s",
-                str(expected_check_sum),
-                str(actual_check_sum),
-            )
+            return memoryview(raw_response)
+        tracer = blauberg_tracing.tracer
+        start = time.perf_counter() if tracer is not None else 0.0
+        try:
+            return self._parse_frame(raw_response).data
+        except BlaubergChecksumError:
+            self._stats.record_checksum_failure()
+            raise
+        finally:
+            if tracer is not None:
+                tracer(blauberg_tracing.FRAME_DECODE, start, time.perf_counter())
 
-        return response[-2]
+    @overload
+    @staticmethod
+    def _decode_data(raw_data: bytes | bytearray | memoryview) -> dict[int, int | None]:
+        ...
 
+    @overload
     @staticmethod
-    def _decode_data(raw_data: bytes) -> dict[int, int | None]:
-        values: dict[int, int | None] = {}
-        lead_byte = bytes()
+    def _decode_data(raw_data: bytes | bytearray | memoryview, values: _Values) -> _Values:
+        ...
+
+    @staticmethod
+    def _decode_data(
+        raw_data: bytes | bytearray | memoryview,
+        values: MutableMapping[int, int | None] | None = None,
+    ) -> MutableMapping[int, int | None]:
+        """decodes the data block into the given values mapping or into a new dict if not given,
+        invalid parameters do not overwrite values that are already in the mapping"""
+        if values is None:
+            values = {}
+        tracer = blauberg_tracing.tracer
+        if tracer is None:
+            return BlaubergProtocol._decode_data_block(raw_data, values)
+        start = time.perf_counter()
+        try:
+            return BlaubergProtocol._decode_data_block(raw_data, values)
+        finally:
+            tracer(blauberg_tracing.DATA_DECODE, start, time.perf_counter())
+
+    @staticmethod
+    def _decode_data_block(
+        raw_data: bytes | bytearray | memoryview,
+        values: MutableMapping[int, int | None],
+    ) -> MutableMapping[int, int | None]:
+        lead_indicator = BlaubergProtocol.LEAD_INDICATOR.value
+        invalid = BlaubergProtocol.INVALID.value
+        dynamic_val = BlaubergProtocol.DYNAMIC_VAL.value
+        data = memoryview(raw_data)
+        size = len(data)
+        lead = 0
         index = 0
-        while index < len(raw_data):
-            func = raw_data[index]
-            if func == BlaubergProtocol.LEAD_INDICATOR.value:
-                index += 1
-                lead_byte = bytes([raw_data[index]])
-                index += 1
-            elif func == BlaubergProtocol.INVALID.value:
-                index += 1
-                tail_byte = bytes([raw_data[index]])
-                index += 1
-                param = Section.Template(2).set_bytes(lead_byte + tail_byte).value
+        while index < size:
+            func = data[index]
+            if func == lead_indicator:
+                lead = data[index + 1] << 8
+                index += 2
+            elif func == invalid:
+                param = lead | data[index + 1]
+                index += 2
                 if param not in values:
                     values[param] = None
-            elif func == BlaubergProtocol.DYNAMIC_VAL.value:
-                index += 1
-                byte_length = raw_data[index]
-                index += 1
-                if (index + byte_length) > len(raw_data):
+            elif func == dynamic_val:
+                byte_length = data[index + 1]
+                index += 2
+                if (index + byte_length) > size:
                     LOG.debug(
                         "byte length given is bigger than length of remaining bytes"
                     )
                     return values
-                tail_byte = bytes([raw_data[index]])
+                param = lead | data[index]
                 index += 1
-                param = Section.Template(2).set_bytes(lead_byte + tail_byte).value
-                dynamic_part = raw_data[index : (index + byte_length)]
-                value = Section.Template(byte_length).set_bytes(dynamic_part).value
-                values[param] = value
+                values[param] = int.from_bytes(data[index : index + byte_length], "big")
                 index += byte_length
             else:
-                tail_byte = bytes([raw_data[index]])
-                index += 1
-                param = Section.Template(2).set_bytes(lead_byte + tail_byte).value
-                value = raw_data[index]
-                index += 1
-                values[param] = value
+                values[lead | func] = data[index + 1]
+                index += 2
         return values
 
     @staticmethod
@@ -358,14 +1055,37 @@ class BlaubergProtocol:
                     data_packet.append(Section(tail))
         return data_packet
 
+    def _split_read(self, parameters: Sequence[int]) -> list[dict[int, None]]:
+        """splits parameters into blocks whose estimated responses fit in the max payload,
+        every parameter needs RESPONSE_PARAM_SIZE bytes and every lead change 2 more bytes"""
+        blocks: list[dict[int, None]] = []
+        block: dict[int, None] = {}
+        size = 0
+        lead = -1
+        for param in sorted(set(parameters)):
+            param_size = RESPONSE_PARAM_SIZE
+            if param >> 8 != lead:
+                param_size += 2
+            if block and size + param_size > self._max_payload:
+                blocks.append(block)
+                block = {}
+                size = 0
+                param_size = RESPONSE_PARAM_SIZE + 2
+            lead = param >> 8
+            block[param] = None
+            size += param_size
+        if block or not blocks:
+            blocks.append(block)
+        return blocks
+
     def read_params(self, parameters: list[int]) -> dict[int, int | None]:
-        params = {}
-        for param in parameters:
-            params[param] = None
-        data_response = self._communicate_block(
-            self.FUNC.R, self._construct_command_block(params)
-        )
-        return self._decode_data(data_response.to_bytes())
+        values: dict[int, int | None] = {}
+        for params in self._split_read(parameters):
+            data_response = self._communicate_block(
+                self.FUNC.R, self._construct_command_block(params)
+            )
+            self._decode_data(data_response, values)
+        return values
 
     def read_param(self, param: int) -> int:
         return self.read_params([param]).get(param) or 0
@@ -374,10 +1094,63 @@ class BlaubergProtocol:
         data_response = self._communicate_block(
             self.FUNC.RW, self._construct_command_block(parameters)
         )
-        return self._decode_data(data_response.to_bytes())
+        return self._decode_data(data_response)
 
     def write_param(self, param: int, value: int) -> int:
         return self.write_params({param: value}).get(param) or 0
 
     def device_type(self, type_parameter: int = 0xB9) -> int:
-        return self.read_param(type_parameter)
\ No newline at end of file
+        return self.read_param(type_parameter)
+
+    def prepare_read(self, parameters: Sequence[int]) -> PreparedRead:
+        commands = []
+        for params in self._split_read(parameters):
+            command = self._construct_command(
+                self.FUNC.R, self._construct_command_block(params).to_bytes()
+            )
+            commands.append(bytes(command))
+        return PreparedRead(tuple(parameters), tuple(commands))
+
+    async def async_read_prepared(self, prepared: PreparedRead) -> dict[int, int | None]:
+        """sends the commands of the read and merges their responses,
+        responses of split reads which didn't arrive are left out.
+        Commands are sent concurrently unless the shared transport sends them one at a time anyway,
+        waiting for it would count as round trip time"""
+        LOG.debug("sending commands: %s", prepared.commands)
+        if len(prepared.commands) == 1:
+            raw_response = await self._async_communicate(prepared.commands[0])
+            return self._decode_data(self._decode_response(raw_response))
+        if self._transport is None:
+            raw_responses = await asyncio.gather(
+                *[self._async_communicate(command) for command in prepared.commands]
+            )
+        else:
+            raw_responses = [
+                await self._async_communicate(command) for command in prepared.commands
+            ]
+        values: dict[int, int | None] = {}
+        for raw_response in raw_responses:
+            self._decode_data(self._decode_response(raw_response), values)
+        return values
+
+    async def async_read_params(
+        self, parameters: Sequence[int]
+    ) -> dict[int, int | None]:
+        return await self.async_read_prepared(self.prepare_read(parameters))
+
+    async def async_read_param(self, param: int) -> int:
+        return (await self.async_read_params([param])).get(param) or 0
+
+    async def async_write_params(
+        self, parameters: Mapping[int, int]
+    ) -> dict[int, int | None]:
+        data_response = await self._async_communicate_block(
+            self.FUNC.RW, self._construct_command_block(parameters)
+        )
+        return self._decode_data(data_response)
+
+    async def async_write_param(self, param: int, value: int) -> int:
+        return (await self.async_write_params({param: value})).get(param) or 0
+
+    async def async_device_type(self, type_parameter: int = 0xB9) -> int:
+        return await self.async_read_param(type_parameter)
\ No newline at end of file
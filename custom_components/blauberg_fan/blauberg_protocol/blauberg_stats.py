@@ -0,0 +1,89 @@
+from __future__ import annotations
+from array import array
+from bisect import bisect_left
+from typing import Any
+
+# upper bounds of the round trip time histogram buckets in seconds, slower responses fall in an overflow bucket.
+# The last bound is the longest timeout of the protocol
+LATENCY_BUCKETS = (
+    0.002,
+    0.005,
+    0.01,
+    0.02,
+    0.05,
+    0.1,
+    0.2,
+    0.5,
+    1.0,
+    2.0,
+    5.0,
+)
+
+
+class BlaubergStats:
+    """Performance counters of a single device, recording only updates preallocated counters
+    so it can be done for every frame. Percentiles are resolved to the upper bound of their bucket
+    """
+
+    def __init__(self) -> None:
+        self._latency_counts = array("Q", bytes(8 * (len(LATENCY_BUCKETS) + 1)))
+        self.responses = 0
+        self.timeouts = 0
+        self.checksum_failures = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.last_poll_duration: float | None = None
+
+    def record_sent(self, size: int) -> None:
+        self.bytes_sent += size
+
+    def record_response(self, size: int, latency: float | None = None) -> None:
+        """latency is only given for responses which can be matched to their request"""
+        self.responses += 1
+        self.bytes_received += size
+        if latency is not None:
+            self._latency_counts[bisect_left(LATENCY_BUCKETS, latency)] += 1
+
+    def record_timeout(self) -> None:
+        self.timeouts += 1
+
+    def record_checksum_failure(self) -> None:
+        self.checksum_failures += 1
+
+    def record_poll(self, duration: float) -> None:
+        self.last_poll_duration = duration
+
+    def latency_percentile(self, percentile: float) -> float | None:
+        """upper bound of the bucket containing the percentile in seconds,
+        None if there are no samples or the percentile is slower than the last bucket"""
+        total = sum(self._latency_counts)
+        if total == 0:
+            return None
+        rank = total * percentile / 100
+        count = 0
+        for bucket, bucket_count in enumerate(self._latency_counts):
+            count += bucket_count
+            if count >= rank:
+                break
+        if bucket == len(LATENCY_BUCKETS):
+            return None
+        return LATENCY_BUCKETS[bucket]
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "latency_p50": self.latency_percentile(50),
+            "latency_p95": self.latency_percentile(95),
+            "latency_p99": self.latency_percentile(99),
+            "latency_histogram": dict(
+                zip(
+                    [str(bound) for bound in LATENCY_BUCKETS] + ["inf"],
+                    self._latency_counts.tolist(),
+                )
+            ),
+            "responses": self.responses,
+            "timeouts": self.timeouts,
+            "checksum_failures": self.checksum_failures,
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "last_poll_duration": self.last_poll_duration,
+        }
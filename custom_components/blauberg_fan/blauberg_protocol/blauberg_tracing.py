@@ -0,0 +1,24 @@
+"""Optional tracing of the phases of a poll, the phases only check if a tracer is set while tracing is off"""
+from __future__ import annotations
+from typing import Protocol
+
+ENCODE = "encode"
+NETWORK = "network"
+FRAME_DECODE = "frame_decode"
+DATA_DECODE = "data_decode"
+PARSE = "parse"
+DISPATCH = "dispatch"
+
+
+class Tracer(Protocol):
+    def __call__(self, phase: str, start: float, end: float) -> None:
+        """called after a phase finished with its start and end from time.perf_counter"""
+
+
+tracer: Tracer | None = None
+
+
+def set_tracer(new_tracer: Tracer | None) -> None:
+    """sets the tracer every phase is reported to, None turns tracing off"""
+    global tracer
+    tracer = new_tracer
@@ -0,0 +1,133 @@
+from __future__ import annotations
+import asyncio
+import socket
+import time
+from ipaddress import ip_address
+
+import logging
+
+LOG = logging.getLogger(__name__)
+
+_HEADER = bytes([0xFD, 0xFD, 0x02])
+# responses of the whole fleet arrive in bursts on the shared socket,
+# the default buffer drops them after a few hundred devices. The kernel may cap it (net.core.rmem_max)
+RECEIVE_BUFFER_SIZE = 1024 * 1024
+# seconds a resolved host name is used before it is looked up again
+RESOLVE_TTL = 300
+
+
+def _frame_device_id(frame: bytes) -> str | None:
+    """returns the device id from the header of a blauberg frame, None if the frame is not a blauberg frame"""
+    if len(frame) < 4 or frame[0:3] != _HEADER:
+        return None
+    id_end = 4 + frame[3]
+    if id_end > len(frame):
+        return None
+    return frame[4:id_end].decode(errors="replace")
+
+
+class BlaubergTransport(asyncio.DatagramProtocol):
+    """Fleet level UDP endpoint, sends the frames of every device through a single bound socket
+    and routes each response to the waiting request by its source address and the device id in its header.
+    Only one request per device is in flight at a time since responses do not carry any request identifier
+    """
+
+    def __init__(self) -> None:
+        self._transport: asyncio.DatagramTransport | None = None
+        self._waiters: dict[
+            tuple[tuple[str, int], str | None], asyncio.Future[bytes]
+        ] = {}
+        self._locks: dict[tuple[tuple[str, int], str | None], asyncio.Lock] = {}
+        # requests holding or waiting for each lock, a lock is dropped when it has none
+        self._lock_users: dict[tuple[tuple[str, int], str | None], int] = {}
+        self._resolved: dict[str, tuple[str, float]] = {}
+
+    async def async_start(self, host: str = "0.0.0.0", port: int = 0) -> None:
+        """binds the shared socket, port 0 picks a free port"""
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECEIVE_BUFFER_SIZE)
+            sock.bind((host, port))
+        except OSError:
+            sock.close()
+            raise
+        loop = asyncio.get_running_loop()
+        await loop.create_datagram_endpoint(lambda: self, sock=sock)
+
+    def close(self) -> None:
+        if self._transport is not None:
+            self._transport.close()
+
+    @property
+    def local_address(self) -> tuple[str, int] | None:
+        if self._transport is None:
+            return None
+        return self._transport.get_extra_info("sockname")
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self._transport = transport  # type: ignore[assignment]
+
+    def connection_lost(self, exc: Exception | None) -> None:
+        self._transport = None
+        for waiter in self._waiters.values():
+            if not waiter.done():
+                waiter.set_exception(exc or ConnectionError("transport is closed"))
+
+    def datagram_received(self, data: bytes, addr: tuple[str, int]) -> None:
+        address = (addr[0], addr[1])
+        waiter = self._waiters.get((address, _frame_device_id(data)))
+        if waiter is None:
+            # requests sent with the default device id accept any responder on the address
+            waiter = self._waiters.get((address, None))
+        if waiter is None or waiter.done():
+            LOG.debug("unexpected response: %s from %s", data, addr)
+            return
+        waiter.set_result(data)
+
+    def error_received(self, exc: Exception) -> None:
+        LOG.debug("transport error: %s", exc)
+
+    async def _resolve(self, host: str, port: int) -> str:
+        """returns the address of the host, host names are looked up once per RESOLVE_TTL"""
+        resolved = self._resolved.get(host)
+        if resolved is not None and time.monotonic() < resolved[1]:
+            return resolved[0]
+        try:
+            address = str(ip_address(host))
+            expires = float("inf")
+        except ValueError:
+            infos = await asyncio.get_running_loop().getaddrinfo(
+                host, port, family=socket.AF_INET, type=socket.SOCK_DGRAM
+            )
+            address = infos[0][4][0]
+            expires = time.monotonic() + RESOLVE_TTL
+        self._resolved[host] = (address, expires)
+        return address
+
+    async def async_request(
+        self, host: str, port: int, device_id: str | None, data: bytes
+    ) -> bytes:
+        """sends the frame to the device and waits for its response, device_id None accepts any device id
+        the caller is responsible for the timeout"""
+        address = (await self._resolve(host, port), port)
+        key = (address, device_id)
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        self._lock_users[key] = self._lock_users.get(key, 0) + 1
+        try:
+            async with lock:
+                if self._transport is None:
+                    raise ConnectionError("transport is not started")
+                waiter = asyncio.get_running_loop().create_future()
+                self._waiters[key] = waiter
+                try:
+                    self._transport.sendto(data, address)
+                    return await waiter
+                finally:
+                    del self._waiters[key]
+        finally:
+            self._lock_users[key] -= 1
+            if not self._lock_users[key]:
+                del self._lock_users[key]
+                del self._locks[key]
@@ -2,6 +2,7 @@
 from .devices import devices as devices
 from .blauberg_device import Purpose as Purpose
 from .blauberg_device import Component as Component
+from .blauberg_device import PollingClass as PollingClass
 from .blauberg_device import BlaubergDevice as BlaubergDevice
 from .blauberg_device import ComplexAction as ComplexAction
 from .blauberg_device import OptionalAction as OptionalAction
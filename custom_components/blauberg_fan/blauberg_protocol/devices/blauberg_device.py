@@ -39,6 +39,14 @@ def SinglePointAction(param: int):
     )
 
 
+class PollingClass(Enum):
+    """represents how often a parameter changes and needs to be read"""
+
+    STATIC = 1  # never changes at runtime, read once
+    SLOW = 2  # settings, read every few polls
+    FAST = 3  # states and sensors, read on every poll
+
+
 class Component(Enum):
     BUTTON = 1
     SWITCH = 2
@@ -68,6 +76,11 @@ class BlaubergDevice(NamedTuple):
     presets: Sequence[str]
     extra_parameters: Sequence[OptionalAction]
     attribute_map: Mapping[str, ComplexAction]
+    # parameters which are not listed are read on every poll
+    polling_classes: Mapping[int, PollingClass] = {}
+    # bytes of a request or response data block the device handles in a single frame,
+    # reads are split into multiple frames above it, None uses the protocol default
+    max_payload: int | None = None
 
 
 def variable_to_bytes(variable: float | str | int | bool | None) -> int:
@@ -7,6 +7,7 @@ from .blauberg_device import (
     ComplexAction,
     Component,
     OptionalAction,
+    PollingClass,
     variable_to_bytes,
 )
 from collections.abc import Mapping
@@ -173,4 +174,10 @@ smart_wifi = BlaubergDevice(
             request_parser=lambda _: {},
         )
     },
+    polling_classes={
+        0x86: PollingClass.STATIC,  # firmware version
+        0x14: PollingClass.SLOW,  # humidity trigger point
+        0x16: PollingClass.SLOW,  # temperature trigger point
+        0x1A: PollingClass.SLOW,  # silent speed point
+    },
 )
@@ -0,0 +1,10 @@
+class BlaubergProtocolError(Exception):
+    """Base class for errors raised by the blauberg protocol"""
+
+
+class BlaubergFrameError(BlaubergProtocolError):
+    """Raised when a received frame is malformed"""
+
+
+class BlaubergChecksumError(BlaubergFrameError):
+    """Raised when the checksum of a received frame doesn't match its content"""
@@ -56,7 +56,8 @@ class BlaubergButton(CoordinatorEntity[BlaubergProtocolCoordinator], ButtonEntit
         identifier,
     ) -> None:
         """Pass coordinator to CoordinatorEntity."""
-        super().__init__(coordinator)
+        # buttons only depend on availability
+        super().__init__(coordinator, ())
         self._unique_id = "%s-%s" % (idx, identifier)
         self._name = name
 
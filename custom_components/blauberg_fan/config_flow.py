@@ -2,7 +2,7 @@
 from __future__ import annotations
 
 from homeassistant.data_entry_flow import FlowResult
-from .blauberg_protocol import BlaubergProtocol
+from .blauberg_protocol import BlaubergProtocol, BlaubergProtocolError
 from .blauberg_protocol.devices import devices as blauberg_devices
 from typing import Any
 from collections.abc import Mapping
@@ -18,7 +18,8 @@ from homeassistant.const import (
 )
 import voluptuous as vol
 
-from .const import DOMAIN
+from .blauberg_coordinator import MIN_SCAN_INTERVAL, MAX_SCAN_INTERVAL
+from .const import DOMAIN, CONF_MIN_INTERVAL, CONF_MAX_INTERVAL
 
 import logging
 
@@ -29,7 +30,7 @@ class FlowException(Exception):
     pass
 
 
-def _device_from_user_input(
+async def _async_device_from_user_input(
     user_input: Mapping[str, Any], config_data: Mapping[str, Any]
 ) -> Mapping[str, Any]:
     host = user_input.get(CONF_HOST)
@@ -39,27 +40,39 @@ def _device_from_user_input(
 
     if host is None:
         raise FlowException("failed_connection")
-    blauberg_device = None
-    if device_id is None:
-        blauberg_device = BlaubergProtocol.discover_device(host, port, password)
-    else:
-        blauberg_device = BlaubergProtocol(host, port, device_id, password)
-    if blauberg_device is None:
+    try:
+        identity = await BlaubergProtocol.async_identify(
+            host, port, password, device_id
+        )
+    except BlaubergProtocolError as err:
+        LOG.info("invalid response from %s: %s", host, err)
+        raise FlowException("failed_connection") from err
+    if identity is None:
         raise FlowException("failed_connection")
+    if not identity.password_valid:
+        raise FlowException("invalid_auth")
 
-    device_id = blauberg_device.device_id
-    device_type = blauberg_device.device_type()
+    device_id = identity.device_id
+    device_type = identity.device_type
 
     if device_type not in blauberg_devices:
         raise FlowException("unknown_device")
 
-    return {
+    device_data = {
         CONF_HOST: host,
         CONF_PORT: port,
         CONF_DEVICE_ID: device_id,
         CONF_PASSWORD: password,
         CONF_TYPE: device_type,
     }
+    for interval in (CONF_MIN_INTERVAL, CONF_MAX_INTERVAL):
+        if interval in user_input:
+            device_data[interval] = user_input[interval]
+    if device_data.get(
+        CONF_MIN_INTERVAL, MIN_SCAN_INTERVAL.total_seconds()
+    ) > device_data.get(CONF_MAX_INTERVAL, MAX_SCAN_INTERVAL.total_seconds()):
+        raise FlowException("invalid_interval")
+    return device_data
 
 
 DEVICE_DATA = vol.Schema(
@@ -76,6 +89,12 @@ DEVICE_DATA = vol.Schema(
         vol.Optional(
             CONF_PASSWORD,
         ): str,
+        vol.Optional(
+            CONF_MIN_INTERVAL,
+        ): vol.All(int, vol.Range(min=1, max=3600)),
+        vol.Optional(
+            CONF_MAX_INTERVAL,
+        ): vol.All(int, vol.Range(min=1, max=3600)),
     }
 )
 
@@ -98,7 +117,7 @@ class BlaubergConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     async def async_step_user(self, user_input=None) -> FlowResult:
         if user_input is not None:
             try:
-                device_data = _device_from_user_input(user_input, {})
+                device_data = await _async_device_from_user_input(user_input, {})
             except FlowException as flow_exception:
                 return await self.async_step_user(error=str(flow_exception))
             
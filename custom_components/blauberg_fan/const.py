@@ -4,3 +4,9 @@ DOMAIN = "blauberg_fan"
 DEVICES = "devices"
 DEVICE_CONFIG = "device_config"
 COORDINATOR = "coordinator"
+TRANSPORT = "transport"
+TRANSPORT_LOCK = "transport_lock"
+RTT_STORE = "rtt_store"
+RTT_SAVE_TIMER = "rtt_save_timer"
+CONF_MIN_INTERVAL = "min_interval"
+CONF_MAX_INTERVAL = "max_interval"
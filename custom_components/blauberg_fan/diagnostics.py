@@ -0,0 +1,32 @@
+"""Diagnostics support for blauberg_fan."""
+from __future__ import annotations
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_DEVICE_ID, CONF_PASSWORD
+from homeassistant.core import HomeAssistant
+
+from .blauberg_coordinator import BlaubergProtocolCoordinator
+from .const import DOMAIN, DEVICES, COORDINATOR
+
+TO_REDACT = {CONF_PASSWORD}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    diagnostics: dict[str, Any] = {"entry": async_redact_data(entry.data, TO_REDACT)}
+    device_data = hass.data[DOMAIN].get(DEVICES, {}).get(entry.data[CONF_DEVICE_ID])
+    if device_data:
+        coordinator: BlaubergProtocolCoordinator = device_data[COORDINATOR]
+        diagnostics["last_update_success"] = coordinator.last_update_success
+        diagnostics["update_interval"] = (
+            None
+            if coordinator.update_interval is None
+            else coordinator.update_interval.total_seconds()
+        )
+        diagnostics["rtt_estimate"] = coordinator.rtt_estimate
+        diagnostics["stats"] = coordinator.stats.as_dict()
+    return diagnostics
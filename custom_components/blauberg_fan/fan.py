@@ -14,7 +14,7 @@ from homeassistant.const import CONF_DEVICE_ID, CONF_DEVICES
 from .const import DOMAIN, DEVICES, COORDINATOR, DEVICE_CONFIG
 
 from .blauberg_protocol.devices import Purpose, BlaubergDevice
-from .blauberg_coordinator import BlaubergProtocolCoordinator
+from .blauberg_coordinator import BlaubergProtocolCoordinator, WriteConflictError
 
 import logging
 
@@ -54,7 +54,11 @@ class BlaubergFan(CoordinatorEntity[BlaubergProtocolCoordinator], FanEntity):
         blauberg_device: BlaubergDevice,
     ) -> None:
         """Pass coordinator to CoordinatorEntity."""
-        super().__init__(coordinator)
+        super().__init__(
+            coordinator,
+            (Purpose.POWER, Purpose.FAN_SPEED, Purpose.PRESET)
+            + tuple(blauberg_device.attribute_map),
+        )
         self._unique_id = str(idx) + "-fan"
         self._attr_is_on = None
         self._attr_percentage = None
@@ -117,9 +121,10 @@ class BlaubergFan(CoordinatorEntity[BlaubergProtocolCoordinator], FanEntity):
     async def async_set_percentage(self, percentage: int) -> None:
         if percentage == 0:
             await self.async_turn_off()
-        elif not self._attr_is_on:
-            await self.async_turn_on()
-        await self.coordinator.set_speed(percentage)
+            return
+        await self.coordinator.set_values(
+            {Purpose.POWER: True, Purpose.FAN_SPEED: percentage}
+        )
 
     async def async_set_preset_mode(self, preset_mode: str) -> None:
         """Set the preset mode of the fan."""
@@ -132,13 +137,27 @@ class BlaubergFan(CoordinatorEntity[BlaubergProtocolCoordinator], FanEntity):
         **kwargs: Any,
     ) -> None:
         """Turn on fan."""
-        if percentage is not None:
-            await self.async_set_percentage(percentage)
+        if percentage == 0:
+            await self.async_turn_off()
             return
+        values: dict[Purpose | str, Any] = {Purpose.POWER: True}
+        if percentage is not None:
+            values[Purpose.FAN_SPEED] = percentage
         if preset_mode is not None:
-            await self.async_set_preset_mode(preset_mode)
-            return
-        await self.coordinator.set_power(True)
+            values[Purpose.PRESET] = preset_mode
+        try:
+            await self.coordinator.set_values(values)
+        except WriteConflictError:
+            if percentage is None or preset_mode is None:
+                raise
+            # conflicts are detected before anything is sent, the preset takes precedence over the speed
+            LOG.info(
+                "%s preset doesn't allow setting the speed, %s%% is ignored",
+                preset_mode,
+                percentage,
+            )
+            del values[Purpose.FAN_SPEED]
+            await self.coordinator.set_values(values)
 
     async def async_turn_off(self, **kwargs: Any) -> None:
         """Turn off fan."""
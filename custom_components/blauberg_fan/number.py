@@ -65,7 +65,7 @@ class BlaubergSlider(CoordinatorEntity[BlaubergProtocolCoordinator], NumberEntit
         identifier,
     ) -> None:
         """Pass coordinator to CoordinatorEntity."""
-        super().__init__(coordinator)
+        super().__init__(coordinator, (name,))
         self._unique_id = "%s-%s" % (idx, identifier)
         self.entity_description = entity_description
         self._latest_value = None
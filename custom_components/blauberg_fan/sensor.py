@@ -1,4 +1,6 @@
 from __future__ import annotations
+from collections.abc import Callable
+from typing import NamedTuple
 
 from homeassistant.components.sensor import (
     SensorEntity,
@@ -13,9 +15,18 @@ from homeassistant.helpers.update_coordinator import (
 )
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
-from homeassistant.const import CONF_DEVICE_ID, CONF_DEVICES, PERCENTAGE, UnitOfTemperature
+from homeassistant.const import (
+    CONF_DEVICE_ID,
+    CONF_DEVICES,
+    PERCENTAGE,
+    EntityCategory,
+    UnitOfInformation,
+    UnitOfTemperature,
+    UnitOfTime,
+)
 from .const import DOMAIN, DEVICES, COORDINATOR, DEVICE_CONFIG
 
+from .blauberg_protocol import BlaubergStats
 from .blauberg_protocol.devices import Purpose, BlaubergDevice
 from .blauberg_coordinator import BlaubergProtocolCoordinator
 
@@ -24,6 +35,89 @@ import logging
 LOG = logging.getLogger(__name__)
 
 
+def _milliseconds(seconds: float | None) -> float | None:
+    return None if seconds is None else round(seconds * 1000, 1)
+
+
+class StatsSensor(NamedTuple):
+    """performance diagnostic of the device and how it is read from the stats"""
+
+    key: str
+    name: str
+    unit: str | None
+    device_class: SensorDeviceClass | None
+    state_class: SensorStateClass
+    value: Callable[[BlaubergStats], float | int | None]
+
+
+STATS_SENSORS = (
+    StatsSensor(
+        "latency_p50",
+        "Latency p50",
+        UnitOfTime.MILLISECONDS,
+        SensorDeviceClass.DURATION,
+        SensorStateClass.MEASUREMENT,
+        lambda stats: _milliseconds(stats.latency_percentile(50)),
+    ),
+    StatsSensor(
+        "latency_p95",
+        "Latency p95",
+        UnitOfTime.MILLISECONDS,
+        SensorDeviceClass.DURATION,
+        SensorStateClass.MEASUREMENT,
+        lambda stats: _milliseconds(stats.latency_percentile(95)),
+    ),
+    StatsSensor(
+        "latency_p99",
+        "Latency p99",
+        UnitOfTime.MILLISECONDS,
+        SensorDeviceClass.DURATION,
+        SensorStateClass.MEASUREMENT,
+        lambda stats: _milliseconds(stats.latency_percentile(99)),
+    ),
+    StatsSensor(
+        "poll_duration",
+        "Poll Duration",
+        UnitOfTime.MILLISECONDS,
+        SensorDeviceClass.DURATION,
+        SensorStateClass.MEASUREMENT,
+        lambda stats: _milliseconds(stats.last_poll_duration),
+    ),
+    StatsSensor(
+        "timeouts",
+        "Timeouts",
+        None,
+        None,
+        SensorStateClass.TOTAL_INCREASING,
+        lambda stats: stats.timeouts,
+    ),
+    StatsSensor(
+        "checksum_failures",
+        "Checksum Failures",
+        None,
+        None,
+        SensorStateClass.TOTAL_INCREASING,
+        lambda stats: stats.checksum_failures,
+    ),
+    StatsSensor(
+        "bytes_sent",
+        "Bytes Sent",
+        UnitOfInformation.BYTES,
+        SensorDeviceClass.DATA_SIZE,
+        SensorStateClass.TOTAL_INCREASING,
+        lambda stats: stats.bytes_sent,
+    ),
+    StatsSensor(
+        "bytes_received",
+        "Bytes Received",
+        UnitOfInformation.BYTES,
+        SensorDeviceClass.DATA_SIZE,
+        SensorStateClass.TOTAL_INCREASING,
+        lambda stats: stats.bytes_received,
+    ),
+)
+
+
 async def async_setup_entry(
     hass: HomeAssistant,
     config_entry: ConfigEntry,
@@ -63,6 +157,21 @@ async def async_setup_entry(
                     blauberg_coordinator, device_id, desc, Purpose.TEMPERATURE_SENSOR
                 )
             )
+        for stats_sensor in STATS_SENSORS:
+            desc = SensorEntityDescription(
+                key=stats_sensor.key,
+                name=blauberg_device.name + " " + stats_sensor.name,
+                native_unit_of_measurement=stats_sensor.unit,
+                device_class=stats_sensor.device_class,
+                state_class=stats_sensor.state_class,
+                entity_category=EntityCategory.DIAGNOSTIC,
+                entity_registry_enabled_default=False,
+            )
+            entities.append(
+                BlaubergStatsSensor(
+                    blauberg_coordinator, device_id, desc, stats_sensor.value
+                )
+            )
     async_add_entities(entities)
 
 
@@ -77,7 +186,7 @@ class BlaubergSensor(CoordinatorEntity[BlaubergProtocolCoordinator], SensorEntit
         coordinator_data_key,
     ) -> None:
         """Pass coordinator to CoordinatorEntity."""
-        super().__init__(coordinator)
+        super().__init__(coordinator, (coordinator_data_key,))
         self._unique_id = "%s-%s" % (idx, coordinator_data_key)
         self._latest_value = None
         self.entity_description = entity_description
@@ -102,3 +211,38 @@ class BlaubergSensor(CoordinatorEntity[BlaubergProtocolCoordinator], SensorEntit
     def device_info(self) -> DeviceInfo | None:
         """Return the device info."""
         return self.coordinator.device_info
+
+
+class BlaubergStatsSensor(CoordinatorEntity[BlaubergProtocolCoordinator], SensorEntity):
+    """Performance diagnostics of the connection to the device, updated after every poll"""
+
+    def __init__(
+        self,
+        coordinator: BlaubergProtocolCoordinator,
+        idx: str,
+        entity_description: SensorEntityDescription,
+        value: Callable[[BlaubergStats], float | int | None],
+    ) -> None:
+        super().__init__(coordinator)
+        self._unique_id = "%s-%s" % (idx, entity_description.key)
+        self.entity_description = entity_description
+        self._value = value
+
+    @property
+    def unique_id(self) -> str:
+        """Return the unique id."""
+        return self._unique_id
+
+    @property
+    def available(self) -> bool:
+        # failed polls are part of the diagnostics
+        return True
+
+    @property
+    def native_value(self) -> float | int | None:
+        return self._value(self.coordinator.stats)
+
+    @property
+    def device_info(self) -> DeviceInfo | None:
+        """Return the device info."""
+        return self.coordinator.device_info
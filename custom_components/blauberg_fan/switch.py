@@ -56,7 +56,7 @@ class BlaubergSwitch(CoordinatorEntity[BlaubergProtocolCoordinator], SwitchEntit
         identifier,
     ) -> None:
         """Pass coordinator to CoordinatorEntity."""
-        super().__init__(coordinator)
+        super().__init__(coordinator, (name,))
         self._unique_id = "%s-%s" % (idx, identifier)
         self._latest_value = None
         self._coordinator_data_key = name
@@ -0,0 +1,322 @@
+"""Benchmark suite for the blauberg protocol codec
+
+Covers command block and frame encoding, frame validation, data block decoding,
+full request/response round trips over loopback and the discovery response path
+with realistic smart_wifi parameter sets and synthetic sets spanning many lead bytes.
+
+Results are compared as speed relative to a fixed pure Python calibration workload measured in the same run,
+so baselines stored on one machine stay meaningful on another. Loopback round trips also depend on the
+kernel and their speed is only reported. Allocations per operation don't depend on the machine,
+they are checked for every case including the round trips.
+
+Run from the repository root:
+    python -m tests.benchmarks.bench_codec                 # compare against stored baselines
+    python -m tests.benchmarks.bench_codec --save          # store current results as baselines
+    python -m tests.benchmarks.bench_codec --check         # exit with 1 on regressions
+    python -m tests.benchmarks.bench_codec -k decode       # only run matching cases
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sys
+import threading
+import time
+import tracemalloc
+from collections.abc import Callable, Mapping
+from typing import NamedTuple
+
+from ezpacket import Section
+
+from custom_components.blauberg_fan.blauberg_protocol import BlaubergProtocol
+from custom_components.blauberg_fan.blauberg_protocol.devices import (
+    BlaubergDevice,
+    Purpose,
+)
+from custom_components.blauberg_fan.blauberg_protocol.devices.smart_wifi import (
+    smart_wifi,
+)
+from tests.simulator import response_block
+
+BASELINES = os.path.join(os.path.dirname(__file__), "baselines.json")
+# minimum duration of a measurement round, best of ROUNDS is reported
+ROUND_TIME = 0.2
+ROUNDS = 5
+# relative slowdown against the baseline which counts as a regression
+REGRESSION_THRESHOLD = 0.25
+# growth of allocated bytes per operation which counts as a regression, on top of a small constant slack
+ALLOC_REGRESSION_THRESHOLD = 0.25
+ALLOC_SLACK = 256
+
+DEVICE_ID = "0025004B4D4D5712"
+
+
+class Case(NamedTuple):
+    name: str
+    run: Callable[[], object]
+
+
+def device_parameters(device: BlaubergDevice) -> list[int]:
+    """parameters read by the coordinator on every poll for the device"""
+    actions = list(device.parameter_map.values())
+    actions.extend(optional.action for optional in device.extra_parameters)
+    actions.extend(device.attribute_map.values())
+    params: dict[int, bool] = {}
+    for action in actions:
+        for param in action.parameters:
+            params[param] = True
+    return list(params)
+
+
+def device_write(device: BlaubergDevice) -> dict[int, int]:
+    """a large write request merged from the request parsers of the device"""
+    request: dict[int, int] = {}
+    request.update(device.parameter_map[Purpose.POWER].request_parser(True))
+    request.update(device.parameter_map[Purpose.FAN_SPEED].request_parser(50))
+    for optional in device.extra_parameters:
+        request.update(optional.action.request_parser(optional.minimum))
+    return request
+
+
+def synthetic_parameters(leads: int = 16, per_lead: int = 16) -> list[int]:
+    return [lead << 8 | tail for lead in range(leads) for tail in range(1, per_lead + 1)]
+
+
+def response_frame(device: BlaubergProtocol, values: Mapping[int, int | None]) -> bytes:
+    return bytes(device._construct_command(device.FUNC.R, response_block(values)))
+
+
+def smart_wifi_values() -> dict[int, int | None]:
+    values: dict[int, int | None] = {param: 1 for param in device_parameters(smart_wifi)}
+    values[0x04] = 0x0A05  # rpm
+    values[0x86] = 0x0106  # firmware version
+    values[0x1D] = None
+    return values
+
+
+def synthetic_values() -> dict[int, int | None]:
+    values: dict[int, int | None] = {}
+    for index, param in enumerate(synthetic_parameters()):
+        values[param] = [index & 0x7F, 0x1234, None, 0x12345678][index % 4]
+    return values
+
+
+class _LoopbackDevice:
+    """answers every datagram on a loopback port with a fixed response frame from a background thread"""
+
+    def __init__(self, response: bytes) -> None:
+        self._response = response
+        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._socket.bind(("127.0.0.1", 0))
+        self.port = self._socket.getsockname()[1]
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def _serve(self) -> None:
+        while True:
+            try:
+                _, addr = self._socket.recvfrom(4096)
+            except OSError:
+                return
+            self._socket.sendto(self._response, addr)
+
+    def close(self) -> None:
+        self._socket.close()
+
+
+def codec_cases() -> list[Case]:
+    device = BlaubergProtocol("127.0.0.1", device_id=DEVICE_ID)
+    sets = {
+        "smart_wifi": (device_parameters(smart_wifi), smart_wifi_values()),
+        "synthetic": (synthetic_parameters(), synthetic_values()),
+    }
+    cases = []
+    for set_name, (params, values) in sets.items():
+        read = {param: None for param in params}
+        write = {
+            param: value
+            for param, value in values.items()
+            if value is not None
+        }
+        block = device._construct_command_block(read).to_bytes()
+        frame = response_frame(device, values)
+        data = device._parse_frame(frame).data
+        cases += [
+            Case(
+                f"construct_command_block read {set_name}",
+                lambda read=read: device._construct_command_block(read),
+            ),
+            Case(
+                f"construct_command_block write {set_name}",
+                lambda write=write: device._construct_command_block(write),
+            ),
+            Case(
+                f"construct_command {set_name}",
+                lambda block=block: device._construct_command(device.FUNC.R, block),
+            ),
+            Case(
+                f"parse_frame checksum {set_name}",
+                lambda frame=frame: device._parse_frame(frame),
+            ),
+            Case(
+                f"decode_data {set_name}",
+                lambda data=data: device._decode_data(data),
+            ),
+        ]
+    write = device_write(smart_wifi)
+    cases.append(
+        Case(
+            "construct_command_block write smart_wifi request parsers",
+            lambda: device._construct_command_block(write),
+        )
+    )
+
+    discovery_frame = response_frame(
+        BlaubergProtocol("127.0.0.1", device_id=DEVICE_ID, password=""),
+        {0x7C: int.from_bytes(DEVICE_ID.encode(), "big")},
+    )
+
+    def discovery_response() -> str | None:
+        params = device._decode_data(device._parse_frame(discovery_frame).data)
+        raw_device_id = params.get(0x7C)
+        if raw_device_id is None or raw_device_id == 0:
+            return None
+        return Section(raw_device_id).to_bytes().decode()
+
+    assert discovery_response() == DEVICE_ID
+    cases.append(Case("discovery response parsing", discovery_response))
+    return cases
+
+
+def round_trip_cases() -> tuple[list[Case], Callable[[], None]]:
+    device_values = smart_wifi_values()
+    loopback = _LoopbackDevice(
+        response_frame(BlaubergProtocol("127.0.0.1", device_id=DEVICE_ID), device_values)
+    )
+    device = BlaubergProtocol("127.0.0.1", loopback.port, DEVICE_ID)
+    params = device_parameters(smart_wifi)
+    prepared = device.prepare_read(params)
+    loop = asyncio.new_event_loop()
+
+    def close() -> None:
+        loopback.close()
+        loop.close()
+
+    assert device.read_params(params) == device_values
+    return [
+        Case("communicate_block round trip smart_wifi", lambda: device.read_params(params)),
+        Case(
+            "async read_prepared round trip smart_wifi",
+            lambda: loop.run_until_complete(device.async_read_prepared(prepared)),
+        ),
+    ], close
+
+
+class Result(NamedTuple):
+    ops_per_sec: float
+    alloc_bytes: int
+    # operations per calibration workload run
+    relative: float = 0.0
+
+
+def calibration() -> int:
+    """fixed workload of byte iteration and dict updates like the codec does, speed of the machine is measured with it"""
+    values = {}
+    for index, byte in enumerate(bytes(range(256))):
+        values[index] = byte << 8 | index
+    return sum(values.values())
+
+
+def measure(run: Callable[[], object]) -> Result:
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            run()
+        elapsed = time.perf_counter() - start
+        if elapsed >= ROUND_TIME:
+            break
+        number *= 2
+    best = elapsed
+    for _ in range(ROUNDS - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            run()
+        best = min(best, time.perf_counter() - start)
+
+    # peak of transient allocations for a single operation
+    tracemalloc.start()
+    run()
+    tracemalloc.reset_peak()
+    current, _ = tracemalloc.get_traced_memory()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return Result(number / best, peak - current)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--save", action="store_true", help="store results as baselines")
+    parser.add_argument("--check", action="store_true", help="fail on regressions")
+    parser.add_argument("-k", dest="keyword", default="", help="only run matching cases")
+    args = parser.parse_args()
+
+    baselines: dict[str, dict[str, float]] = {}
+    if os.path.exists(BASELINES):
+        with open(BASELINES, encoding="utf-8") as baseline_file:
+            baselines = json.load(baseline_file)
+
+    cases = codec_cases()
+    loopback_cases, close = round_trip_cases()
+    cases += loopback_cases
+    unchecked = {case.name for case in loopback_cases}
+    calibration_ops = measure(calibration).ops_per_sec
+    print("calibration: %.0f ops/sec" % calibration_ops)
+
+    results: dict[str, dict[str, float]] = {}
+    regressions = []
+    print("%-58s %14s %12s %10s" % ("case", "ops/sec", "alloc B/op", "baseline"))
+    try:
+        for case in cases:
+            if args.keyword not in case.name:
+                continue
+            result = measure(case.run)
+            result = result._replace(relative=result.ops_per_sec / calibration_ops)
+            results[case.name] = result._asdict()
+            comparison = ""
+            baseline = baselines.get(case.name)
+            if baseline is not None and "relative" in baseline:
+                change = result.relative / baseline["relative"] - 1
+                comparison = "%+9.1f%%" % (change * 100)
+                if case.name in unchecked:
+                    comparison += " (not checked)"
+                elif change < -REGRESSION_THRESHOLD:
+                    comparison += " REGRESSION"
+                    regressions.append(case.name)
+            if baseline is not None and result.alloc_bytes > baseline[
+                "alloc_bytes"
+            ] * (1 + ALLOC_REGRESSION_THRESHOLD) + ALLOC_SLACK:
+                comparison += " ALLOCATION REGRESSION"
+                regressions.append(case.name)
+            print(
+                "%-58s %14.0f %12d %10s"
+                % (case.name, result.ops_per_sec, result.alloc_bytes, comparison)
+            )
+    finally:
+        close()
+
+    if args.save:
+        baselines.update(results)
+        with open(BASELINES, "w", encoding="utf-8") as baseline_file:
+            json.dump(baselines, baseline_file, indent=2, sort_keys=True)
+            baseline_file.write("\n")
+    if args.check and regressions:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
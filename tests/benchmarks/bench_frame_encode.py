@@ -0,0 +1,69 @@
+"""Micro-benchmark for command frame encoding
+
+Compares the previous ezpacket based frame construction with the precompiled prefix encoder.
+Run from the repository root: python -m tests.benchmarks.bench_frame_encode
+"""
+from __future__ import annotations
+import timeit
+
+from ezpacket import Packet, Section, DynamicSection, ExpandingSection
+
+from custom_components.blauberg_fan.blauberg_protocol import BlaubergProtocol
+
+REPEAT = 5
+NUMBER = 20000
+
+
+def _legacy_construct_command(
+    device: BlaubergProtocol, function: Section, data: Packet
+) -> Packet:
+    command = Packet(
+        [
+            device.HEADER,
+            device.PROTOCOL_TYPE,
+            DynamicSection().set_bytes(bytes(device.device_id, "utf-8")),
+            DynamicSection().set_bytes(bytes(device.password, "utf-8")),
+            device.FUNC.Template,
+            ExpandingSection(),
+            device.CHECKSUM,
+        ]
+    )
+    command[-3] = function
+    command[-2] = Section(data.to_int(), data.byte_size())
+    command[-1] = _legacy_checksum(Packet(command[1:-1]))
+    return command
+
+
+def _legacy_checksum(data: Packet) -> Section:
+    check_sum = sum(data.to_bytes())
+    return Section(BlaubergProtocol._swap_high_low(check_sum), 2)
+
+
+def _best_ns_per_frame(statement) -> float:
+    return min(timeit.repeat(statement, number=NUMBER, repeat=REPEAT)) / NUMBER * 1e9
+
+
+def main() -> None:
+    device = BlaubergProtocol("127.0.0.1", device_id="0025004B4D4D5712")
+    block = device._construct_command_block(
+        {param: None for param in [0x01, 0x03, 0x04, 0x18, 0x2E, 0x31, 0x86, 0xB9]}
+    )
+    block_bytes = block.to_bytes()
+    assert (
+        _legacy_construct_command(device, device.FUNC.R, block).to_bytes()
+        == device._construct_command(device.FUNC.R, block_bytes)
+    )
+
+    before = _best_ns_per_frame(
+        lambda: _legacy_construct_command(device, device.FUNC.R, block).to_bytes()
+    )
+    after = _best_ns_per_frame(
+        lambda: device._construct_command(device.FUNC.R, block_bytes)
+    )
+    print("frame encode before: %10.0f ns/frame" % before)
+    print("frame encode after:  %10.0f ns/frame" % after)
+    print("speedup:             %10.1fx" % (before / after))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Micro-benchmark for coordinator response parsing
+
+Compares the previous per action filtering of the response with the compiled parse plan
+on a full smart_wifi poll response.
+Run from the repository root: python -m tests.benchmarks.bench_parse_data
+"""
+from __future__ import annotations
+import asyncio
+import tempfile
+import timeit
+from collections.abc import Mapping, Sequence
+from typing import Any
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.blauberg_fan.blauberg_coordinator import (
+    BlaubergProtocolCoordinator,
+)
+from custom_components.blauberg_fan.blauberg_protocol import BlaubergProtocol
+from custom_components.blauberg_fan.blauberg_protocol.devices import BlaubergDevice
+from tests.benchmarks.bench_codec import smart_wifi_values
+from tests.simulator import SMART_WIFI_TYPE
+
+REPEAT = 5
+NUMBER = 20000
+
+
+def _legacy_filter_response_by_params(
+    response: Mapping[int, int | None], params: Sequence[int]
+) -> Mapping[int, int | None] | None:
+    result = {}
+    for param in params:
+        if param in response:
+            result[param] = response[param]
+        else:
+            return None
+    return result
+
+
+def _legacy_parse_data(
+    device: BlaubergDevice, response: Mapping[int, int | None]
+) -> dict[Any, Any]:
+    result = {}
+    for attribute in device.attribute_map:
+        action = device.attribute_map[attribute]
+        filtered_response = _legacy_filter_response_by_params(response, action.parameters)
+        if filtered_response is not None:
+            result[attribute] = action.response_parser(filtered_response)
+    for optional_action in device.extra_parameters:
+        action = optional_action.action
+        filtered_response = _legacy_filter_response_by_params(response, action.parameters)
+        if filtered_response is not None:
+            result[optional_action.name] = action.response_parser(filtered_response)
+    for purpose in device.parameter_map:
+        action = device.parameter_map[purpose]
+        filtered_response = _legacy_filter_response_by_params(response, action.parameters)
+        if filtered_response is not None:
+            result[purpose] = action.response_parser(filtered_response)
+    return result
+
+
+def _best_ns_per_parse(statement) -> float:
+    return min(timeit.repeat(statement, number=NUMBER, repeat=REPEAT)) / NUMBER * 1e9
+
+
+async def _coordinator() -> BlaubergProtocolCoordinator:
+    return BlaubergProtocolCoordinator(
+        HomeAssistant(tempfile.gettempdir()),
+        BlaubergProtocol("127.0.0.1"),
+        SMART_WIFI_TYPE,
+    )
+
+
+def main() -> None:
+    # parsing doesn't need the event loop, it is only required to create the coordinator
+    coordinator = asyncio.run(_coordinator())
+    device = coordinator._device
+    assert device is not None
+    response = smart_wifi_values()
+    assert _legacy_parse_data(device, response) == coordinator._parse_data(response)
+
+    before = _best_ns_per_parse(lambda: _legacy_parse_data(device, response))
+    after = _best_ns_per_parse(lambda: coordinator._parse_data(response))
+    print("parse data before: %10.0f ns/poll" % before)
+    print("parse data after:  %10.0f ns/poll" % after)
+    print("speedup:           %10.1fx" % (before / after))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+"""Fleet scale load test for BlaubergProtocolCoordinator
+
+Starts N coordinators sharing one transport, as the integration does, against simulated devices
+running in a separate process and drives poll cycles for all of them at once.
+Entities are created by the real platform setups, their state writes are counted instead of written.
+
+Reports per fleet size:
+- poll cycle duration and per device poll duration percentiles
+- event loop lag while polling
+- CPU time of this process per device poll, the simulator runs in its own process
+- memory allocated per device for protocol, coordinator and entities
+- entity state writes triggered per cycle
+
+Run from the repository root:
+    python -m tests.benchmarks.load_test --devices 100 500 1000 --cycles 5
+    python -m tests.benchmarks.load_test --platforms sensor number
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import multiprocessing
+import statistics
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Sequence
+from multiprocessing.connection import Connection
+from typing import Any
+
+from homeassistant.components.fan import FanEntityFeature
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import CONF_DEVICE_ID
+from homeassistant.core import HomeAssistant
+
+from custom_components.blauberg_fan import fan, number, sensor
+from custom_components.blauberg_fan.blauberg_coordinator import (
+    BlaubergProtocolCoordinator,
+)
+from custom_components.blauberg_fan.blauberg_protocol import (
+    BlaubergProtocol,
+    BlaubergTransport,
+)
+from custom_components.blauberg_fan.blauberg_protocol.devices import (
+    devices as blauberg_devices,
+)
+from custom_components.blauberg_fan.const import (
+    COORDINATOR,
+    DEVICE_CONFIG,
+    DEVICES,
+    DOMAIN,
+)
+from tests.simulator import SMART_WIFI_TYPE, Faults, Simulator
+
+PLATFORMS = {"fan": fan, "sensor": sensor, "number": number}
+# interval of the event loop lag probe
+LAG_PROBE_INTERVAL = 0.005
+
+
+def _run_simulator(connection: Connection, count: int, faults: Faults) -> None:
+    async def run() -> None:
+        simulator = Simulator(faults, seed=0)
+        await simulator.async_add_fleet(count)
+        connection.send(
+            [(device.device_id, device.password, address) for device, address in simulator.devices]
+        )
+        await asyncio.get_running_loop().run_in_executor(None, connection.recv)
+        simulator.close()
+
+    asyncio.run(run())
+
+
+def _percentiles(values: Sequence[float]) -> str:
+    if len(values) < 2:
+        return "p50 %.1f ms" % (values[0] * 1000 if values else 0)
+    cuts = statistics.quantiles(values, n=100, method="inclusive")
+    return "p50 %7.1f ms  p95 %7.1f ms  p99 %7.1f ms  max %7.1f ms" % (
+        cuts[49] * 1000,
+        cuts[94] * 1000,
+        cuts[98] * 1000,
+        max(values) * 1000,
+    )
+
+
+class _LagProbe:
+    """measures how late the event loop wakes up a sleeping task"""
+
+    def __init__(self) -> None:
+        self.lags: list[float] = []
+        self._task: asyncio.Task | None = None
+
+    async def _probe(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + LAG_PROBE_INTERVAL
+            await asyncio.sleep(LAG_PROBE_INTERVAL)
+            self.lags.append(max(0.0, loop.time() - expected))
+
+    def start(self) -> None:
+        self._task = asyncio.get_running_loop().create_task(self._probe())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+
+
+async def _setup_fleet(
+    hass: HomeAssistant,
+    transport: BlaubergTransport,
+    devices: list[tuple[str, str, tuple[str, int]]],
+    writes: list[int],
+    platforms: Sequence[Any],
+) -> list[BlaubergProtocolCoordinator]:
+    """sets up coordinators and entities the way the integration does"""
+    coordinators = []
+    device_config = blauberg_devices[SMART_WIFI_TYPE]
+    for device_id, password, (host, port) in devices:
+        coordinator = BlaubergProtocolCoordinator(
+            hass,
+            BlaubergProtocol(host, port, device_id, password, transport=transport),
+            SMART_WIFI_TYPE,
+        )
+        # cycles are driven by the load test
+        coordinator.update_interval = None
+        hass.data[DOMAIN][DEVICES][device_id] = {
+            DEVICE_CONFIG: device_config,
+            COORDINATOR: coordinator,
+        }
+        entry = ConfigEntry(
+            version=1,
+            minor_version=1,
+            domain=DOMAIN,
+            title=device_id,
+            data={CONF_DEVICE_ID: device_id},
+            source="user",
+        )
+        entities: list[Any] = []
+        for platform in platforms:
+            await platform.async_setup_entry(hass, entry, entities.extend)
+        for entity in entities:
+            if not entity.entity_registry_enabled_default:
+                # disabled entities like the diagnostic sensors are not added to home assistant
+                continue
+            entity.hass = hass
+            entity.async_write_ha_state = lambda: writes.__setitem__(0, writes[0] + 1)
+            coordinator.async_add_listener(
+                entity._handle_coordinator_update, entity.coordinator_context
+            )
+        coordinators.append(coordinator)
+    return coordinators
+
+
+async def _load_test(
+    devices: list[tuple[str, str, tuple[str, int]]], cycles: int, platforms: Sequence[str]
+) -> None:
+    hass = HomeAssistant(tempfile.gettempdir())
+    hass.data[DOMAIN] = {DEVICES: {}}
+    transport = BlaubergTransport()
+    await transport.async_start("127.0.0.1")
+    writes = [0]
+
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    coordinators = await _setup_fleet(
+        hass, transport, devices, writes, [PLATFORMS[name] for name in platforms]
+    )
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    async def poll(coordinator: BlaubergProtocolCoordinator) -> float:
+        start = time.perf_counter()
+        await coordinator.async_refresh()
+        return time.perf_counter() - start
+
+    cycle_durations = []
+    poll_durations: list[float] = []
+    write_counts = []
+    cpu = 0.0
+    failures = 0
+    probe = _LagProbe()
+    probe.start()
+    for _ in range(cycles):
+        writes[0] = 0
+        cpu_start = time.process_time()
+        start = time.perf_counter()
+        poll_durations += await asyncio.gather(*[poll(c) for c in coordinators])
+        cycle_durations.append(time.perf_counter() - start)
+        cpu += time.process_time() - cpu_start
+        write_counts.append(writes[0])
+        failures += sum(1 for c in coordinators if not c.last_update_success)
+    probe.stop()
+    transport.close()
+
+    polls = cycles * len(coordinators)
+    print(
+        "devices: %d, cycles: %d, failed polls: %d, platforms: %s"
+        % (len(coordinators), cycles, failures, ", ".join(platforms))
+    )
+    print("  poll cycle:        %s" % _percentiles(cycle_durations))
+    print("  device poll:       %s" % _percentiles(poll_durations))
+    print("  event loop lag:    %s" % _percentiles(probe.lags))
+    print("  cpu per poll:      %.3f ms" % (cpu / polls * 1000))
+    print("  memory per device: %.1f KiB" % ((after - before) / len(coordinators) / 1024))
+    print("  state writes:      %.1f per cycle" % statistics.mean(write_counts))
+
+
+def _default_platforms() -> list[str]:
+    platforms = list(PLATFORMS)
+    if not hasattr(FanEntityFeature, "TURN_ON"):
+        # the fan platform needs a newer Home Assistant
+        print("skipping fan platform, FanEntityFeature.TURN_ON is not supported by this Home Assistant")
+        platforms.remove("fan")
+    return platforms
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--platforms", nargs="+", choices=list(PLATFORMS), default=None,
+        help="platforms creating entities, all supported platforms by default",
+    )
+    parser.add_argument("--devices", type=int, nargs="+", default=[100, 500, 1000])
+    parser.add_argument("--cycles", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.005)
+    parser.add_argument("--jitter", type=float, default=0.005)
+    parser.add_argument("--loss", type=float, default=0.0)
+    parser.add_argument("--corruption", type=float, default=0.0)
+    args = parser.parse_args()
+
+    platforms = args.platforms or _default_platforms()
+    faults = Faults(args.latency, args.jitter, args.loss, args.corruption)
+    for count in args.devices:
+        connection, child_connection = multiprocessing.Pipe()
+        simulator = multiprocessing.Process(
+            target=_run_simulator, args=(child_connection, count, faults), daemon=True
+        )
+        simulator.start()
+        try:
+            asyncio.run(_load_test(connection.recv(), args.cycles, platforms))
+        finally:
+            connection.send(None)
+            simulator.join(timeout=5)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+from __future__ import annotations
+import asyncio
+import tempfile
+from collections.abc import Awaitable, Callable
+from datetime import timedelta
+from typing import Any
+
+import pytest
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.blauberg_fan.blauberg_coordinator import (
+    INTERVAL_SPEED_UP,
+    MAX_SCAN_INTERVAL,
+    SLOW_POLL_CYCLES,
+    BlaubergProtocolCoordinator,
+    WriteConflictError,
+)
+from custom_components.blauberg_fan.blauberg_protocol import (
+    BlaubergProtocol,
+    blauberg_tracing,
+    set_tracer,
+)
+from custom_components.blauberg_fan.blauberg_protocol.devices import Purpose
+from tests.simulator import SMART_WIFI_TYPE, Faults, SimulatedDevice, Simulator
+
+
+def _with_coordinator(
+    action: Callable[[BlaubergProtocolCoordinator, SimulatedDevice], Awaitable[Any]],
+    faults: Faults = Faults(),
+) -> Any:
+    async def run() -> Any:
+        hass = HomeAssistant(tempfile.gettempdir())
+        simulator = Simulator(faults)
+        device = SimulatedDevice("SIM0000000000001")
+        host, port = await simulator.async_add_device(device)
+        coordinator = BlaubergProtocolCoordinator(
+            hass,
+            BlaubergProtocol(host, port, device.device_id, device.password, timeout=0.2),
+            SMART_WIFI_TYPE,
+        )
+        coordinator.update_interval = None
+        try:
+            await coordinator.async_refresh()
+            return await action(coordinator, device)
+        finally:
+            simulator.close()
+            await hass.async_stop(force=True)
+
+    return asyncio.run(run())
+
+
+def test_coordinator_coalesces_writes():
+    async def burst(coordinator: BlaubergProtocolCoordinator, device: SimulatedDevice):
+        requests = device.requests
+        await asyncio.gather(
+            *[coordinator.set_optional_param("Silent Speed Point", value) for value in range(30, 40)]
+        )
+        return device.requests - requests, device.parameters[0x1A], coordinator.data["Silent Speed Point"]
+
+    assert _with_coordinator(burst) == (1, 39, 39)
+
+
+def test_coordinator_merges_writes_while_a_frame_is_in_flight():
+    async def burst(coordinator: BlaubergProtocolCoordinator, device: SimulatedDevice):
+        requests = device.requests
+        writes = []
+        for value in range(30, 40):
+            writes.append(asyncio.create_task(coordinator.set_optional_param("Silent Speed Point", value)))
+            await asyncio.sleep(0.002)
+        await asyncio.gather(*writes)
+        return device.requests - requests < 10, device.parameters[0x1A]
+
+    assert _with_coordinator(burst, Faults(latency=0.01)) == (True, 39)
+
+
+def test_coordinator_merges_writes_of_different_purposes():
+    async def burst(coordinator: BlaubergProtocolCoordinator, device: SimulatedDevice):
+        await asyncio.gather(
+            coordinator.set_power(False),
+            coordinator.set_optional_param("Humidity Sensor Trigger Point", 70),
+            coordinator.set_optional_param("Temperature Sensor Trigger Point", 30),
+        )
+        return device.parameters[0x01], device.parameters[0x14], device.parameters[0x16], coordinator.data[Purpose.POWER]
+
+    assert _with_coordinator(burst) == (0, 70, 30, 0)
+
+
+def test_coordinator_set_values_in_one_frame():
+    async def set_values(coordinator: BlaubergProtocolCoordinator, device: SimulatedDevice):
+        await coordinator.set_power(False)
+        requests = device.requests
+        await coordinator.set_values({Purpose.POWER: True, Purpose.FAN_SPEED: 80, "Silent Speed Point": 35})
+        return device.requests - requests, device.parameters[0x01], device.parameters[0x18], device.parameters[0x1A]
+
+    assert _with_coordinator(set_values) == (1, 1, 80, 35)
+
+
+def test_coordinator_set_values_conflict():
+    async def set_values(coordinator: BlaubergProtocolCoordinator, device: SimulatedDevice):
+        requests = device.requests
+        with pytest.raises(WriteConflictError):
+            # speed enables all day mode which the silent preset disables
+            await coordinator.set_values({Purpose.FAN_SPEED: 80, Purpose.PRESET: "silent"})
+        return device.requests - requests
+
+    assert _with_coordinator(set_values) == 0
+
+
+def test_coordinator_optimistic_update():
+    async def set_speed(coordinator: BlaubergProtocolCoordinator, device: SimulatedDevice):
+        write = asyncio.create_task(coordinator.set_speed(80))
+        await asyncio.sleep(0.01)
+        optimistic = coordinator.data[Purpose.FAN_SPEED], write.done()
+        await write
+        return optimistic, coordinator.data[Purpose.FAN_SPEED]
+
+    assert _with_coordinator(set_speed, Faults(latency=0.05)) == ((80, False), 80)
+
+
+def test_coordinator_optimistic_update_rolled_back(caplog: pytest.LogCaptureFixture):
+    async def set_speed(coordinator: BlaubergProtocolCoordinator, device: SimulatedDevice):
+        device.password = "0000"
+        await coordinator.set_speed(80)
+        return coordinator.data[Purpose.FAN_SPEED]
+
+    assert _with_coordinator(set_speed) == 50
+    assert "did not confirm" in caplog.text
+
+
+def test_coordinator_optimistic_update_rejected(caplog: pytest.LogCaptureFixture):
+    async def set_silent_speed(coordinator: BlaubergProtocolCoordinator, device: SimulatedDevice):
+        del device.parameters[0x1A]
+        await coordinator.set_optional_param("Silent Speed Point", 35)
+        return coordinator.data["Silent Speed Point"]
+
+    assert _with_coordinator(set_silent_speed) is None
+    assert "rejected Silent Speed Point=35" in caplog.text
+
+
+def test_coordinator_adapts_interval():
+    async def poll(coordinator: BlaubergProtocolCoordinator, device: SimulatedDevice):
+        coordinator.update_interval = timedelta(seconds=4)
+        intervals = []
+        await coordinator.async_refresh()
+        intervals.append(coordinator.update_interval)
+        await coordinator.async_refresh()
+        intervals.append(coordinator.update_interval)
+        device.parameters[0x2E] += 5
+        await coordinator.async_refresh()
+        intervals.append(coordinator.update_interval)
+        await coordinator.set_power(False)
+        intervals.append(coordinator.update_interval)
+        return [interval.total_seconds() for interval in intervals]
+
+    assert _with_coordinator(poll) == [6, 9, 4.5, 2]
+
+
+def test_coordinator_tiered_polling():
+    async def poll(coordinator: BlaubergProtocolCoordinator, device: SimulatedDevice):
+        polled = []
+        for _ in range(SLOW_POLL_CYCLES):
+            polled.append(coordinator._poll_params())
+            await coordinator.async_refresh()
+        return polled, coordinator.data[Purpose.VERSION], coordinator.data["Silent Speed Point"]
+
+    polled, version, silent_speed = _with_coordinator(poll)
+    assert 0x86 not in polled[0] and 0x1A not in polled[0] and 0x2E in polled[0]
+    assert all(polled[0] == params for params in polled[1:-1])
+    assert 0x86 not in polled[-1] and 0x1A in polled[-1]
+    assert (version, silent_speed) == ("1.6", 40)
+
+
+def test_coordinator_notifies_changed_keys_only():
+    async def poll(coordinator: BlaubergProtocolCoordinator, device: SimulatedDevice):
+        calls = {"power": 0, "silent": 0, "all": 0}
+        coordinator.async_add_listener(lambda: calls.__setitem__("power", calls["power"] + 1), (Purpose.POWER,))
+        coordinator.async_add_listener(
+            lambda: calls.__setitem__("silent", calls["silent"] + 1), ("Silent Speed Point",))
+        coordinator.async_add_listener(lambda: calls.__setitem__("all", calls["all"] + 1))
+        # new listeners get their first update
+        await coordinator.async_refresh()
+        await coordinator.async_refresh()
+        device.parameters[0x01] = 0
+        await coordinator.async_refresh()
+        return calls
+
+    assert _with_coordinator(poll) == {"power": 2, "silent": 1, "all": 3}
+
+
+def test_coordinator_backs_off_unreachable_device():
+    async def poll(coordinator: BlaubergProtocolCoordinator, device: SimulatedDevice):
+        coordinator._blauberg_protocol._retries = 0  # type: ignore
+        coordinator.update_interval = timedelta(seconds=4)
+        # devices don't answer frames with a wrong password
+        device.password = "0000"
+        for _ in range(BlaubergProtocol.DEFAULT_FAILURE_THRESHOLD):
+            await coordinator.async_refresh()
+        unreachable = coordinator.last_update_success, coordinator.update_interval
+        device.password = "1111"
+        await coordinator.async_refresh()
+        return unreachable, coordinator.last_update_success, coordinator.update_interval
+
+    assert _with_coordinator(poll) == (
+        (False, MAX_SCAN_INTERVAL), True, MAX_SCAN_INTERVAL / INTERVAL_SPEED_UP)
+
+
+def test_coordinator_records_poll_duration():
+    async def poll(coordinator: BlaubergProtocolCoordinator, device: SimulatedDevice):
+        await coordinator.async_refresh()
+        return coordinator.stats.last_poll_duration
+
+    assert _with_coordinator(poll, Faults(latency=0.05)) == pytest.approx(0.05, abs=0.04)
+
+
+def test_coordinator_traces_poll_phases():
+    phases: list[str] = []
+
+    async def poll(coordinator: BlaubergProtocolCoordinator, device: SimulatedDevice):
+        coordinator.async_add_listener(lambda: None)
+        set_tracer(lambda phase, start, end: phases.append(phase))
+        try:
+            await coordinator.async_refresh()
+        finally:
+            set_tracer(None)
+
+    _with_coordinator(poll)
+    assert phases[-2:] == [blauberg_tracing.PARSE, blauberg_tracing.DISPATCH]
+    assert blauberg_tracing.NETWORK in phases
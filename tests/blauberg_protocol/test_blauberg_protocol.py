@@ -1,10 +1,15 @@
 
 from __future__ import annotations
+import asyncio
+import socket
+import time
+import ifaddr
 import pytest
 from custom_components.blauberg_fan.blauberg_protocol import *
 from ezpacket import *
 from typing import Optional
 from collections.abc import Mapping
+from tests.simulator import Faults, SimulatedDevice, Simulator
 
 TEST_HOST = "0.0.0.0"
 
@@ -75,3 +80,454 @@ def test_blauberg_construct_command_block_for_write(input: Mapping[int, int], ex
 def test_blauberg_decode_data(input: bytes, expected: dict[int, Optional[int]]):
     assert BlaubergProtocol(host=TEST_HOST)._decode_data(  # type: ignore
         input) == expected
+
+
+
+def test_blauberg_decode_data_from_memoryview():
+    raw = bytes([0xFD, 0xFD, 0xFF, 0x02, 0xFE, 0x02, 0x40, 0x51, 0x68, 0x01, 0x01])
+    assert BlaubergProtocol._decode_data(  # type: ignore
+        memoryview(raw)[2:-2]) == {0x0240: 0x5168}
+
+
+@pytest.mark.parametrize(
+    "input,values,expected", [
+        (bytes([0x9B, 0x02]), {0x9B: 0x01, 0x07: 0x01}, {0x9B: 0x02, 0x07: 0x01}),
+        (bytes([0xFD, 0x9B]), {0x9B: 0x01}, {0x9B: 0x01}),
+        (bytes([0xFD, 0x9B]), {}, {0x9B: None}),
+    ]
+)
+def test_blauberg_decode_data_into_values(input: bytes, values: dict[int, Optional[int]], expected: dict[int, Optional[int]]):
+    result = BlaubergProtocol._decode_data(input, values)  # type: ignore
+    assert result is values
+    assert values == expected
+
+@pytest.mark.parametrize(
+    "device_id,password,data,expected", [
+        ("ABC", "1111", bytes([0xFF, 0x00, 0x01, 0x18]),
+         bytes.fromhex("fdfd0203414243043131313101ff000118ac02")),
+        (BlaubergProtocol.DEFAULT_DEVICE_ID, "", bytes([0x7C]),
+         bytes.fromhex("fdfd021044454641554c545f444556494345494400017c3005")),
+    ]
+)
+def test_blauberg_construct_command(device_id: str, password: str, data: bytes, expected: bytes):
+    assert BlaubergProtocol(host=TEST_HOST, device_id=device_id, password=password)._construct_command(  # type: ignore
+        BlaubergProtocol.FUNC.R, data) == expected
+
+def test_blauberg_prepare_read():
+    device = BlaubergProtocol(host=TEST_HOST, device_id="ABC")
+    prepared = device.prepare_read([0x18, 0x01])
+    assert prepared.parameters == (0x18, 0x01)
+    assert prepared.commands == (bytes.fromhex("fdfd0203414243043131313101ff000118ac02"),)
+
+@pytest.mark.parametrize(
+    "max_payload,expected", [
+        (256, [[0x01, 0x18, 0x0302, 0x0305]]),
+        (14, [[0x01, 0x18], [0x0302, 0x0305]]),
+        (11, [[0x01], [0x18], [0x0302], [0x0305]]),
+    ]
+)
+def test_blauberg_split_read(max_payload: int, expected: list[list[int]]):
+    device = BlaubergProtocol(host=TEST_HOST, max_payload=max_payload)
+    blocks = device._split_read([0x0305, 0x18, 0x01, 0x0302, 0x18])  # type: ignore
+    assert [list(block) for block in blocks] == expected
+
+
+def test_blauberg_prepare_read_splits_frames():
+    device = BlaubergProtocol(host=TEST_HOST, device_id="ABC", max_payload=14)
+    prepared = device.prepare_read([0x01, 0x18, 0x86])
+    assert len(prepared.commands) == 2
+    assert prepared.commands[0] == device.prepare_read([0x01, 0x18]).commands[0]
+    assert prepared.commands[1] == device.prepare_read([0x86]).commands[0]
+
+
+def test_blauberg_max_payload_too_small():
+    with pytest.raises(ValueError):
+        BlaubergProtocol(host=TEST_HOST, max_payload=6)
+
+
+def test_blauberg_parse_frame():
+    frame = BlaubergProtocol._parse_frame(  # type: ignore
+        bytes.fromhex("fdfd0203414243043131313101ff000118ac02"))
+    assert frame.device_id == "ABC"
+    assert frame.password == "1111"
+    assert frame.function == 0x01
+    assert bytes(frame.data) == bytes([0xFF, 0x00, 0x01, 0x18])
+
+
+@pytest.mark.parametrize(
+    "input,error", [
+        (bytes.fromhex("fdfd0203414243043131313101ff000118ac03"), BlaubergChecksumError),
+        (bytes.fromhex("fdfd0203414243043131313101ff000119ac02"), BlaubergChecksumError),
+        (bytes.fromhex("fdfe0203414243043131313101ff000118ac02"), BlaubergFrameError),
+        (bytes.fromhex("fdfd0303414243043131313101ff000118ac02"), BlaubergFrameError),
+        (bytes.fromhex("fdfd0220414243043131313101ff000118ac02"), BlaubergFrameError),
+        (bytes.fromhex("fdfd0203414243083131313101ac02"), BlaubergFrameError),
+        (bytes.fromhex("fdfd0200"), BlaubergFrameError),
+    ]
+)
+def test_blauberg_parse_frame_rejects_corrupt_frames(input: bytes, error: type):
+    with pytest.raises(error):
+        BlaubergProtocol._parse_frame(input)  # type: ignore
+
+def _with_simulated_device(faults: Faults, action):
+    async def run():
+        simulator = Simulator(faults)
+        device = SimulatedDevice("SIM0000000000001")
+        host, port = await simulator.async_add_device(device)
+        try:
+            return await action(BlaubergProtocol(host, port, device.device_id, device.password, timeout=0.2))
+        finally:
+            simulator.close()
+
+    return asyncio.run(run())
+
+
+def test_blauberg_async_read_params():
+    assert _with_simulated_device(
+        Faults(), lambda device: device.async_read_params([0x01, 0x18, 0x86, 0xAA])
+    ) == {0x01: 0x01, 0x18: 50, 0x86: 0x0106, 0xAA: None}
+
+
+def test_blauberg_async_read_prepared_split():
+    async def read(device: BlaubergProtocol):
+        device._max_payload = 14  # type: ignore
+        prepared = device.prepare_read([0x01, 0x18, 0x86, 0xAA])
+        return len(prepared.commands), await device.async_read_prepared(prepared)
+
+    assert _with_simulated_device(Faults(), read) == (
+        2, {0x01: 0x01, 0x18: 50, 0x86: 0x0106, 0xAA: None})
+
+
+def test_blauberg_async_write_params():
+    assert _with_simulated_device(
+        Faults(), lambda device: device.async_write_params({0x01: 0x00, 0x18: 80})
+    ) == {0x01: 0x00, 0x18: 80}
+
+
+def test_blauberg_async_read_params_wrong_password():
+    async def read(device: BlaubergProtocol):
+        device._set_credentials(device.device_id, "0000")  # type: ignore
+        return await device.async_read_params([0x01])
+
+    assert _with_simulated_device(Faults(), read) == {}
+
+
+def _scripted_attempts(device: BlaubergProtocol, responses: list[Optional[bytes]]) -> list[bytes]:
+    """replaces single attempts of the device with the given responses, returns the sent data"""
+    sent: list[bytes] = []
+
+    async def attempt(data: bytes, measure: bool = False) -> Optional[bytes]:
+        sent.append(data)
+        await asyncio.sleep(0)
+        return responses.pop(0)
+
+    device._async_attempt = attempt  # type: ignore
+    return sent
+
+
+def test_blauberg_async_communicate_retries():
+    async def communicate():
+        device = BlaubergProtocol(host=TEST_HOST, backoff=0)
+        sent = _scripted_attempts(device, [None, None, b"response"])
+        return await device._async_communicate(b"request"), len(sent), device.circuit_open  # type: ignore
+
+    assert asyncio.run(communicate()) == (b"response", 3, False)
+
+
+def test_blauberg_async_communicate_opens_circuit():
+    async def communicate():
+        device = BlaubergProtocol(host=TEST_HOST, retries=0, failure_threshold=2)
+        probe = device.prepare_read([BlaubergProtocol.DEVICE_TYPE_PARAM]).commands[0]
+        sent = _scripted_attempts(device, [None, None, None, probe, b"response"])
+        for _ in range(2):
+            assert await device._async_communicate(b"request") == b""  # type: ignore
+        assert device.circuit_open
+        # only the probe is sent while the device doesn't answer
+        assert await device._async_communicate(b"request") == b""  # type: ignore
+        assert sent[2:] == [probe]
+        assert await device._async_communicate(b"request") == b"response"  # type: ignore
+        return sent[3:] == [probe, b"request"], device.circuit_open
+
+    assert asyncio.run(communicate()) == (True, False)
+
+
+def test_blauberg_async_communicate_shares_probe():
+    async def communicate():
+        device = BlaubergProtocol(host=TEST_HOST, retries=0, failure_threshold=1)
+        sent = _scripted_attempts(device, [None, None])
+        await device._async_communicate(b"request")  # type: ignore
+        responses = await asyncio.gather(
+            *[device._async_communicate(b"request") for _ in range(5)]  # type: ignore
+        )
+        return responses, len(sent)
+
+    assert asyncio.run(communicate()) == ([b""] * 5, 2)
+
+
+def test_blauberg_rtt_estimate():
+    device = BlaubergProtocol(host=TEST_HOST)
+    assert device.rtt_estimate is None and device.timeout == BlaubergProtocol.DEFAULT_TIMEOUT
+    device._sample_rtt(0.2)  # type: ignore
+    assert device.rtt_estimate == pytest.approx((0.2, 0.1))
+    assert device.timeout == pytest.approx(0.6)
+    for _ in range(50):
+        device._sample_rtt(0.015)  # type: ignore
+    assert device.rtt_estimate[0] == pytest.approx(0.015, abs=0.001)  # type: ignore
+    assert device.timeout == BlaubergProtocol.MIN_TIMEOUT
+    device.restore_rtt_estimate(2, 1)
+    assert device.timeout == BlaubergProtocol.MAX_TIMEOUT
+
+
+def test_blauberg_async_timeout_follows_rtt():
+    async def read(device: BlaubergProtocol):
+        await device.async_read_params([0x01])
+        measured = device.rtt_estimate, device.timeout
+        device._set_credentials(device.device_id, "0000")  # type: ignore
+        device._retries = 0  # type: ignore
+        await device.async_read_params([0x01])
+        return measured, device.timeout
+
+    (rtt, timeout), backed_off = _with_simulated_device(Faults(latency=0.05), read)
+    assert rtt[0] == pytest.approx(0.05, abs=0.02)
+    assert timeout == pytest.approx(rtt[0] + BlaubergProtocol.RTT_K * rtt[1])
+    assert backed_off == pytest.approx(timeout * 2)
+
+
+def test_blauberg_async_discover_device():
+    async def discover(device: BlaubergProtocol):
+        discovered = await BlaubergProtocol.async_discover_device(device.host, device.port, timeout=0.2)
+        return discovered.device_id, await discovered.async_device_type()
+
+    assert _with_simulated_device(Faults(), discover) == ("SIM0000000000001", 0x600)
+
+
+def _identify(password: str, device_id: Optional[str]) -> tuple[Optional[DeviceIdentity], int]:
+    async def identify() -> tuple[Optional[DeviceIdentity], int]:
+        simulator = Simulator()
+        device = SimulatedDevice("SIM0000000000001")
+        host, port = await simulator.async_add_device(device)
+        try:
+            identity = await BlaubergProtocol.async_identify(host, port, password, device_id, timeout=0.2)
+            return identity, device.requests
+        finally:
+            simulator.close()
+
+    return asyncio.run(identify())
+
+
+@pytest.mark.parametrize(
+    "password,device_id,expected,frames", [
+        ("1111", "SIM0000000000001", DeviceIdentity("SIM0000000000001", 0x600, 0x0106, True), 1),
+        ("1111", None, DeviceIdentity("SIM0000000000001", 0x600, 0x0106, True), 2),
+        ("0000", "SIM0000000000001", DeviceIdentity("SIM0000000000001", 0x600, 0x0106, False), 1),
+        ("0000", None, DeviceIdentity("SIM0000000000001", 0x600, 0x0106, False), 1),
+        ("1111", "SIM0000000000009", DeviceIdentity("SIM0000000000001", 0x600, 0x0106, True), 2),
+    ]
+)
+def test_blauberg_async_identify(password: str, device_id: Optional[str], expected: DeviceIdentity, frames: int):
+    assert _identify(password, device_id) == (expected, frames)
+
+
+class _LossyDevice(SimulatedDevice):
+    """drops the frames with the given indexes, counting every frame it receives"""
+
+    def __init__(self, device_id: str, drops: set[int]) -> None:
+        super().__init__(device_id)
+        self.drops = drops
+        self.frames = 0
+
+    def handle(self, frame: bytes) -> Optional[bytes]:
+        self.frames += 1
+        if self.frames - 1 in self.drops:
+            return None
+        return super().handle(frame)
+
+
+@pytest.mark.parametrize(
+    "device_id,drops", [
+        # the authenticated frame is lost
+        ("SIM0000000000001", {0}),
+        # the first password check after the discovery mode read is lost
+        (None, {1}),
+    ]
+)
+def test_blauberg_async_identify_lost_frame(device_id: Optional[str], drops: set[int]):
+    async def identify() -> Optional[DeviceIdentity]:
+        simulator = Simulator()
+        device = _LossyDevice("SIM0000000000001", drops)
+        host, port = await simulator.async_add_device(device)
+        try:
+            return await BlaubergProtocol.async_identify(host, port, "1111", device_id, timeout=0.2)
+        finally:
+            simulator.close()
+
+    assert asyncio.run(identify()) == DeviceIdentity("SIM0000000000001", 0x600, 0x0106, True)
+
+
+def test_blauberg_async_identify_unreachable():
+    async def identify() -> Optional[DeviceIdentity]:
+        loop = asyncio.get_running_loop()
+        transport, _ = await loop.create_datagram_endpoint(
+            asyncio.DatagramProtocol, local_addr=("127.0.0.1", 0))
+        port = transport.get_extra_info("sockname")[1]
+        try:
+            return await BlaubergProtocol.async_identify("127.0.0.1", port, timeout=0.05)
+        finally:
+            transport.close()
+
+    assert asyncio.run(identify()) is None
+
+
+def test_blauberg_async_read_params_corrupted():
+    with pytest.raises(BlaubergChecksumError):
+        _with_simulated_device(
+            Faults(corruption=1), lambda device: device.async_read_params([0x01]))
+
+def test_blauberg_async_read_params_timeout():
+    async def read() -> dict[int, Optional[int]]:
+        loop = asyncio.get_running_loop()
+        transport, _ = await loop.create_datagram_endpoint(
+            asyncio.DatagramProtocol, local_addr=("127.0.0.1", 0))
+        port = transport.get_extra_info("sockname")[1]
+        try:
+            return await BlaubergProtocol("127.0.0.1", port, timeout=0.05).async_read_params([0x01])
+        finally:
+            transport.close()
+
+    assert asyncio.run(read()) == {}
+
+
+
+
+def _discover(
+    monkeypatch: pytest.MonkeyPatch, devices: list[SimulatedDevice], timeout: float, faults: Faults = Faults()
+) -> tuple[list[tuple[str, str]], float]:
+    hosts = ["127.0.0.%d" % (index + 2) for index in range(len(devices))]
+    monkeypatch.setattr(BlaubergProtocol, "_broadcast_addresses", staticmethod(lambda interfaces=None: hosts))
+
+    async def discover() -> tuple[list[tuple[str, str]], float]:
+        simulator = Simulator(faults)
+        port = 0
+        for device, host in zip(devices, hosts):
+            _, port = await simulator.async_add_device(device, host, port)
+        start = time.monotonic()
+        try:
+            discovered = [
+                (device.host, device.device_id)
+                async for device in BlaubergProtocol.async_discover(port, timeout=timeout, quiet_period=0.1)
+            ]
+            return sorted(discovered), time.monotonic() - start
+        finally:
+            simulator.close()
+
+    return asyncio.run(discover())
+
+
+def test_blauberg_async_discover_finishes_when_quiet(monkeypatch: pytest.MonkeyPatch):
+    discovered, duration = _discover(
+        monkeypatch, [SimulatedDevice("SIM0000000000001"), SimulatedDevice("SIM0000000000002")], 10)
+    assert discovered == [("127.0.0.2", "SIM0000000000001"), ("127.0.0.3", "SIM0000000000002")]
+    # far below the timeout, slow machines only make it longer
+    assert duration < 5
+
+
+def test_blauberg_async_discover_waits_for_slow_devices(monkeypatch: pytest.MonkeyPatch):
+    # the first response takes longer than the quiet period
+    discovered, _ = _discover(monkeypatch, [SimulatedDevice("SIM0000000000001")], 1, Faults(latency=0.3))
+    assert discovered == [("127.0.0.2", "SIM0000000000001")]
+
+
+def test_blauberg_async_discover_skips_wrong_password(monkeypatch: pytest.MonkeyPatch):
+    discovered, _ = _discover(
+        monkeypatch, [SimulatedDevice("SIM0000000000001"), SimulatedDevice("SIM0000000000002", "0000")], 0.3)
+    assert discovered == [("127.0.0.2", "SIM0000000000001")]
+
+
+def _fake_adapters(monkeypatch: pytest.MonkeyPatch, interfaces: list[tuple[int, str]]) -> list[int]:
+    adapters = [
+        ifaddr.Adapter("eth0", "eth0", [ifaddr.IP("192.168.1.10", 24, "eth0")]),
+        ifaddr.Adapter("docker0", "docker0", [ifaddr.IP("172.17.0.1", 16, "docker0")]),
+        ifaddr.Adapter("lo", "lo", [ifaddr.IP("127.0.0.1", 8, "lo")]),
+    ]
+    calls = [0]
+
+    def get_adapters():
+        calls[0] += 1
+        return adapters
+
+    monkeypatch.setattr(ifaddr, "get_adapters", get_adapters)
+    monkeypatch.setattr(socket, "if_nameindex", lambda: list(interfaces))
+    monkeypatch.setattr(BlaubergProtocol, "_adapter_cache_key", None)
+    return calls
+
+
+def test_blauberg_broadcast_addresses_cached_until_interfaces_change(monkeypatch: pytest.MonkeyPatch):
+    interfaces = [(1, "lo"), (2, "eth0"), (3, "docker0")]
+    calls = _fake_adapters(monkeypatch, interfaces)
+    assert BlaubergProtocol._broadcast_addresses() == ["192.168.1.255", "172.17.255.255"]
+    assert BlaubergProtocol._broadcast_addresses() == ["192.168.1.255", "172.17.255.255"]
+    assert calls[0] == 1
+    interfaces.append((4, "veth0"))
+    BlaubergProtocol._broadcast_addresses()
+    assert calls[0] == 2
+
+
+def test_blauberg_broadcast_addresses_interface_filter(monkeypatch: pytest.MonkeyPatch):
+    _fake_adapters(monkeypatch, [(1, "lo"), (2, "eth0"), (3, "docker0")])
+    assert BlaubergProtocol._broadcast_addresses(["eth0"]) == ["192.168.1.255"]
+    assert BlaubergProtocol._broadcast_addresses(["wlan0"]) == []
+
+
+def test_blauberg_async_sweep(monkeypatch: pytest.MonkeyPatch):
+    devices = [
+        SimulatedDevice("SIM0000000000001"),
+        SimulatedDevice("SIM0000000000002", "0000"),
+        SimulatedDevice("SIM0000000000003"),
+    ]
+    monkeypatch.setattr(
+        BlaubergProtocol, "_broadcast_addresses", staticmethod(lambda interfaces=None: []))
+
+    async def sweep() -> tuple[list[tuple[str, str]], float]:
+        simulator = Simulator()
+        port = 0
+        for index, device in enumerate(devices):
+            _, port = await simulator.async_add_device(device, "127.0.0.%d" % (index + 2), port)
+        start = time.monotonic()
+        try:
+            discovered = [
+                (device.host, device.device_id)
+                async for device in BlaubergProtocol.async_sweep(
+                    "127.0.0.0/28", port, timeout=0.5, rate=1000, window=4)
+            ]
+            return sorted(discovered), time.monotonic() - start
+        finally:
+            simulator.close()
+
+    discovered, duration = asyncio.run(sweep())
+    assert discovered == [("127.0.0.2", "SIM0000000000001"), ("127.0.0.4", "SIM0000000000003")]
+    # 14 hosts through a window of 4, silent hosts hold their slot for the whole timeout.
+    # Timers never fire early so the lower bound is exact, the upper bound only has to stay below
+    # the 7 seconds of sending the hosts one at a time and leaves a lot of room for slow machines
+    assert 1.5 < duration < 6
+
+
+def test_blauberg_async_sweep_answers_free_the_window():
+    async def sweep() -> tuple[list[str], float]:
+        simulator = Simulator()
+        _, port = await simulator.async_add_device(SimulatedDevice("SIM0000000000001"), "127.0.0.1")
+        await simulator.async_add_device(SimulatedDevice("SIM0000000000002"), "127.0.0.2", port)
+        start = time.monotonic()
+        try:
+            discovered = [
+                device.device_id
+                async for device in BlaubergProtocol.async_sweep("127.0.0.0/30", port, timeout=10, window=1)
+            ]
+            return sorted(discovered), time.monotonic() - start
+        finally:
+            simulator.close()
+
+    discovered, duration = asyncio.run(sweep())
+    assert discovered == ["SIM0000000000001", "SIM0000000000002"]
+    # waiting for the slot of the first host to time out would take 10 seconds
+    assert duration < 5
+
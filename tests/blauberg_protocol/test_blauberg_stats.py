@@ -0,0 +1,62 @@
+from __future__ import annotations
+import asyncio
+import pytest
+from custom_components.blauberg_fan.blauberg_protocol import *
+from tests.simulator import Faults, SimulatedDevice, Simulator
+
+
+def test_blauberg_stats_percentiles():
+    stats = BlaubergStats()
+    assert stats.latency_percentile(50) is None
+    for _ in range(90):
+        stats.record_response(10, 0.004)
+    for _ in range(9):
+        stats.record_response(10, 0.03)
+    stats.record_response(10, 0.7)
+    assert stats.latency_percentile(50) == 0.005
+    assert stats.latency_percentile(95) == 0.05
+    assert stats.latency_percentile(99) == 0.05
+    assert stats.latency_percentile(100) == 1.0
+    assert (stats.responses, stats.bytes_received) == (100, 1000)
+
+
+def test_blauberg_stats_overflow():
+    stats = BlaubergStats()
+    stats.record_response(10, 10)
+    assert stats.latency_percentile(50) is None
+    assert stats.as_dict()["latency_histogram"]["inf"] == 1
+
+
+def _stats_of_read(faults: Faults, retries: int = 0) -> BlaubergStats:
+    async def run() -> BlaubergStats:
+        simulator = Simulator(faults)
+        device = SimulatedDevice("SIM0000000000001")
+        host, port = await simulator.async_add_device(device)
+        protocol = BlaubergProtocol(
+            host, port, device.device_id, device.password, timeout=0.2, retries=retries)
+        try:
+            await protocol.async_read_params([0x01, 0x18])
+        except BlaubergChecksumError:
+            pass
+        finally:
+            simulator.close()
+        return protocol.stats
+
+    return asyncio.run(run())
+
+
+def test_blauberg_stats_recorded_by_protocol():
+    stats = _stats_of_read(Faults())
+    assert stats.bytes_sent > 0 and stats.bytes_received > 0
+    assert stats.responses == 1
+    assert stats.latency_percentile(50) is not None
+    assert (stats.timeouts, stats.checksum_failures) == (0, 0)
+
+
+def test_blauberg_stats_timeouts():
+    stats = _stats_of_read(Faults(loss=1), retries=1)
+    assert (stats.timeouts, stats.responses, stats.bytes_received) == (2, 0, 0)
+
+
+def test_blauberg_stats_checksum_failures():
+    assert _stats_of_read(Faults(corruption=1)).checksum_failures == 1
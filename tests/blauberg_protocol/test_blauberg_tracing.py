@@ -0,0 +1,47 @@
+from __future__ import annotations
+import asyncio
+from collections.abc import Iterator
+import pytest
+from custom_components.blauberg_fan.blauberg_protocol import *
+from custom_components.blauberg_fan.blauberg_protocol import blauberg_tracing
+from tests.simulator import Faults, SimulatedDevice, Simulator
+
+
+@pytest.fixture
+def phases() -> Iterator[list[str]]:
+    traced: list[str] = []
+
+    def tracer(phase: str, start: float, end: float) -> None:
+        assert start <= end
+        traced.append(phase)
+
+    set_tracer(tracer)
+    try:
+        yield traced
+    finally:
+        set_tracer(None)
+
+
+def test_blauberg_tracing_read(phases: list[str]):
+    async def read():
+        simulator = Simulator(Faults())
+        device = SimulatedDevice("SIM0000000000001")
+        host, port = await simulator.async_add_device(device)
+        try:
+            protocol = BlaubergProtocol(host, port, device.device_id, device.password)
+            return await protocol.async_read_params([0x01])
+        finally:
+            simulator.close()
+
+    assert asyncio.run(read()) == {0x01: 0x01}
+    assert phases == [
+        blauberg_tracing.ENCODE,
+        blauberg_tracing.NETWORK,
+        blauberg_tracing.FRAME_DECODE,
+        blauberg_tracing.DATA_DECODE,
+    ]
+
+
+def test_blauberg_tracing_off():
+    assert blauberg_tracing.tracer is None
+    assert BlaubergProtocol._decode_data(bytes([0x01, 0x01])) == {0x01: 0x01}  # type: ignore
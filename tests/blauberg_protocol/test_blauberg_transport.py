@@ -0,0 +1,93 @@
+from __future__ import annotations
+import asyncio
+import pytest
+from custom_components.blauberg_fan.blauberg_protocol import *
+from custom_components.blauberg_fan.blauberg_protocol.blauberg_transport import _frame_device_id
+from ezpacket import *
+from typing import Optional
+
+
+class _Responder(asyncio.DatagramProtocol):
+    """answers every request with the requested device id and the given data block"""
+
+    def __init__(self, responses: dict[str, Packet]) -> None:
+        self.responses = responses
+        self.transport: asyncio.DatagramTransport | None = None
+
+    def connection_made(self, transport) -> None:
+        self.transport = transport
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        device_id = _frame_device_id(data)
+        assert device_id is not None
+        device = BlaubergProtocol("127.0.0.1", device_id=device_id)
+        reply = device._construct_command(  # type: ignore
+            device.FUNC.R, self.responses[device_id].to_bytes())
+        self.transport.sendto(reply, addr)  # type: ignore
+
+
+@pytest.mark.parametrize(
+    "input,expected", [
+        (bytes([0xFD, 0xFD, 0x02, 0x02, 0x41, 0x42, 0x00]), "AB"),
+        (bytes([0xFD, 0xFD, 0x02, 0x05, 0x41, 0x42]), None),
+        (bytes([0xFD, 0xFE, 0x02, 0x01, 0x41]), None),
+        (bytes(), None),
+    ]
+)
+def test_frame_device_id(input: bytes, expected: Optional[str]):
+    assert _frame_device_id(input) == expected
+
+
+def test_blauberg_transport_routes_by_device_id():
+    async def read() -> list[dict[int, Optional[int]]]:
+        loop = asyncio.get_running_loop()
+        server, _ = await loop.create_datagram_endpoint(
+            lambda: _Responder({
+                "FAN0000000000001": Packet([Section(0x01), Section(0x01)]),
+                "FAN0000000000002": Packet([Section(0x01), Section(0x00)]),
+            }),
+            local_addr=("127.0.0.1", 0))
+        port = server.get_extra_info("sockname")[1]
+        transport = BlaubergTransport()
+        await transport.async_start("127.0.0.1")
+        try:
+            devices = [
+                BlaubergProtocol("127.0.0.1", port, device_id, transport=transport)
+                for device_id in ["FAN0000000000001", "FAN0000000000002"]
+            ]
+            responses = await asyncio.gather(*[device.async_read_params([0x01]) for device in devices])
+            assert not transport._locks
+            return responses
+        finally:
+            transport.close()
+            server.close()
+
+    assert asyncio.run(read()) == [{0x01: 0x01}, {0x01: 0x00}]
+
+
+def test_blauberg_transport_resolves_host_names_once():
+    async def read() -> tuple[list[dict[int, Optional[int]]], int]:
+        loop = asyncio.get_running_loop()
+        lookups = [0]
+        getaddrinfo = loop.getaddrinfo
+
+        async def counting_getaddrinfo(*args, **kwargs):
+            lookups[0] += 1
+            return await getaddrinfo(*args, **kwargs)
+
+        loop.getaddrinfo = counting_getaddrinfo  # type: ignore
+        server, _ = await loop.create_datagram_endpoint(
+            lambda: _Responder({"FAN0000000000001": Packet([Section(0x01), Section(0x01)])}),
+            local_addr=("127.0.0.1", 0))
+        port = server.get_extra_info("sockname")[1]
+        transport = BlaubergTransport()
+        await transport.async_start("127.0.0.1")
+        try:
+            device = BlaubergProtocol("localhost", port, "FAN0000000000001", transport=transport)
+            responses = [await device.async_read_params([0x01]) for _ in range(3)]
+            return responses, lookups[0]
+        finally:
+            transport.close()
+            server.close()
+
+    assert asyncio.run(read()) == ([{0x01: 0x01}] * 3, 1)
@@ -0,0 +1,298 @@
+"""Local blauberg device simulator for load testing
+
+Speaks the same frame format as BlaubergProtocol without depending on its implementation:
+header 0xFDFD, type 0x02, length prefixed device id and password, function byte,
+data block with LEAD/INVALID/DYNAMIC encoding and the byte swapped checksum.
+Every device has its own parameter table seeded from the smart_wifi profile and listens on its own loopback port,
+many devices can run in a single process. Latency, packet loss and checksum corruption can be injected.
+
+Run a fleet from the repository root:
+    python -m tests.simulator --devices 100 --latency 0.01 --loss 0.01
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import random
+from collections.abc import Mapping
+from typing import NamedTuple
+
+import logging
+
+LOG = logging.getLogger(__name__)
+
+HEADER = bytes([0xFD, 0xFD])
+PROTOCOL_TYPE = 0x02
+FUNC_R = 0x01
+FUNC_RW = 0x03
+FUNC_RESPONSE = 0x06
+LEAD_INDICATOR = 0xFF
+INVALID = 0xFD
+DYNAMIC_VAL = 0xFE
+
+DEFAULT_DEVICE_ID = "DEFAULT_DEVICEID"
+DEVICE_ID_PARAM = 0x7C
+DEVICE_TYPE_PARAM = 0xB9
+SMART_WIFI_TYPE = 0x600
+
+# smart_wifi parameter table, see custom_components/blauberg_fan/blauberg_protocol/devices/smart_wifi.py
+SMART_WIFI_PARAMETERS: Mapping[int, int] = {
+    0x01: 1,  # power
+    0x03: 1,  # all day mode
+    0x04: 0x2C06,  # rpm, bytes are swapped
+    0x05: 0,  # boost
+    0x0F: 0,  # humidity trigger
+    0x11: 0,  # temperature trigger
+    0x12: 0,  # motion trigger
+    0x13: 0,  # external switch trigger
+    0x14: 60,  # humidity trigger point
+    0x16: 25,  # temperature trigger point
+    0x18: 50,  # maximum speed
+    0x1A: 40,  # silent speed
+    0x1B: 50,  # maximum speed
+    0x1D: 0,  # interval ventilation
+    0x1E: 0,  # silent mode
+    0x2E: 45,  # humidity
+    0x31: 22,  # temperature
+    0x86: 0x0106,  # firmware version
+    DEVICE_TYPE_PARAM: SMART_WIFI_TYPE,
+}
+
+
+class Faults(NamedTuple):
+    """faults injected into the traffic of simulated devices, probabilities are between 0 and 1"""
+
+    latency: float = 0.0  # seconds before a response is sent
+    jitter: float = 0.0  # random extra latency up to given seconds
+    loss: float = 0.0  # probability of dropping a request
+    corruption: float = 0.0  # probability of corrupting the checksum of a response
+
+
+def checksum(frame_body: bytes | bytearray) -> bytes:
+    """checksum of the bytes following the header, high and low bytes are swapped"""
+    check_sum = sum(frame_body) & 0xFFFF
+    return bytes([check_sum & 0xFF, check_sum >> 8])
+
+
+def encode_frame(device_id: str, password: str, function: int, data: bytes) -> bytes:
+    id_bytes = device_id.encode()
+    password_bytes = password.encode()
+    body = bytearray([PROTOCOL_TYPE, len(id_bytes)])
+    body += id_bytes
+    body.append(len(password_bytes))
+    body += password_bytes
+    body.append(function)
+    body += data
+    return HEADER + body + checksum(body)
+
+
+def response_block(values: Mapping[int, int | None]) -> bytes:
+    """encodes values the way devices answer, single byte values are sent plain,
+    bigger values as dynamic values and unknown parameters as invalid"""
+    block = bytearray()
+    lead = 0
+    for param in sorted(values):
+        if param >> 8 != lead:
+            lead = param >> 8
+            block += bytes([LEAD_INDICATOR, lead])
+        tail = param & 0xFF
+        value = values[param]
+        if value is None:
+            block += bytes([INVALID, tail])
+        elif value <= 0xFF and tail not in (INVALID, DYNAMIC_VAL, LEAD_INDICATOR):
+            block += bytes([tail, value])
+        else:
+            value_bytes = value.to_bytes(max(1, (value.bit_length() + 7) // 8), "big")
+            block += bytes([DYNAMIC_VAL, len(value_bytes), tail])
+            block += value_bytes
+    return bytes(block)
+
+
+class Request(NamedTuple):
+    device_id: str
+    password: str
+    function: int
+    reads: list[int]
+    writes: dict[int, int]
+    # lead indicators or dynamic values are used in the data block
+    complex_block: bool
+
+
+def decode_request(frame: bytes) -> Request | None:
+    """decodes a request frame, returns None for frames with invalid header, sections or checksum"""
+    if len(frame) < 8 or frame[0:2] != HEADER or frame[2] != PROTOCOL_TYPE:
+        return None
+    if checksum(frame[2:-2]) != frame[-2:]:
+        return None
+    index = 3
+    sections = []
+    for _ in range(2):
+        end = index + 1 + frame[index]
+        if end >= len(frame) - 2:
+            return None
+        sections.append(frame[index + 1 : end].decode(errors="replace"))
+        index = end
+    function = frame[index]
+    data = frame[index + 1 : -2]
+    reads: list[int] = []
+    writes: dict[int, int] = {}
+    complex_block = False
+    lead = 0
+    index = 0
+    try:
+        while index < len(data):
+            if data[index] == LEAD_INDICATOR:
+                lead = data[index + 1] << 8
+                complex_block = True
+                index += 2
+            elif data[index] == DYNAMIC_VAL:
+                size = data[index + 1]
+                param = lead | data[index + 2]
+                writes[param] = int.from_bytes(data[index + 3 : index + 3 + size], "big")
+                complex_block = True
+                index += 3 + size
+            else:
+                reads.append(lead | data[index])
+                index += 1
+    except IndexError:
+        return None
+    return Request(sections[0], sections[1], function, reads, writes, complex_block)
+
+
+class SimulatedDevice:
+    """a single simulated device answering requests from its parameter table"""
+
+    def __init__(
+        self,
+        device_id: str,
+        password: str = "1111",
+        parameters: Mapping[int, int] = SMART_WIFI_PARAMETERS,
+    ) -> None:
+        self.device_id = device_id
+        self.password = password
+        self.parameters: dict[int, int] = dict(parameters)
+        self.parameters[DEVICE_ID_PARAM] = int.from_bytes(device_id.encode(), "big")
+        self.requests = 0
+
+    def handle(self, frame: bytes) -> bytes | None:
+        """returns the response frame for the request or None if the device wouldn't answer"""
+        request = decode_request(frame)
+        if request is None:
+            return None
+        if request.device_id == DEFAULT_DEVICE_ID:
+            # discovery mode only answers simple blocks and ignores the password
+            if request.complex_block:
+                return None
+        elif request.device_id != self.device_id or request.password != self.password:
+            return None
+        if request.function not in (FUNC_R, FUNC_RW):
+            return None
+        self.requests += 1
+        values: dict[int, int | None] = {}
+        for param in request.reads:
+            values[param] = self.parameters.get(param)
+        for param, value in request.writes.items():
+            if request.function == FUNC_RW and param in self.parameters:
+                self.parameters[param] = value
+            values[param] = self.parameters.get(param)
+        return encode_frame(
+            self.device_id, self.password, FUNC_RESPONSE, response_block(values)
+        )
+
+
+class _DeviceEndpoint(asyncio.DatagramProtocol):
+    def __init__(self, device: SimulatedDevice, faults: Faults, rng: random.Random) -> None:
+        self._device = device
+        self._faults = faults
+        self._rng = rng
+        self.transport: asyncio.DatagramTransport | None = None
+
+    def connection_made(self, transport) -> None:
+        self.transport = transport
+
+    def datagram_received(self, data: bytes, addr: tuple[str, int]) -> None:
+        faults = self._faults
+        if faults.loss and self._rng.random() < faults.loss:
+            return
+        response = self._device.handle(data)
+        if response is None:
+            return
+        if faults.corruption and self._rng.random() < faults.corruption:
+            response = response[:-1] + bytes([response[-1] ^ 0xFF])
+        delay = faults.latency
+        if faults.jitter:
+            delay += self._rng.random() * faults.jitter
+        if delay > 0:
+            asyncio.get_running_loop().call_later(delay, self._send, response, addr)
+        else:
+            self._send(response, addr)
+
+    def _send(self, response: bytes, addr: tuple[str, int]) -> None:
+        if self.transport is not None and not self.transport.is_closing():
+            self.transport.sendto(response, addr)
+
+
+class Simulator:
+    """runs simulated devices on loopback ports in the current event loop"""
+
+    def __init__(self, faults: Faults = Faults(), seed: int | None = None) -> None:
+        self.faults = faults
+        self._rng = random.Random(seed)
+        self.devices: list[tuple[SimulatedDevice, tuple[str, int]]] = []
+        self._transports: list[asyncio.DatagramTransport] = []
+
+    async def async_add_device(
+        self, device: SimulatedDevice, host: str = "127.0.0.1", port: int = 0
+    ) -> tuple[str, int]:
+        """starts answering for the device, port 0 picks a free port, returns the bound address"""
+        loop = asyncio.get_running_loop()
+        transport, _ = await loop.create_datagram_endpoint(
+            lambda: _DeviceEndpoint(device, self.faults, self._rng),
+            local_addr=(host, port),
+        )
+        self._transports.append(transport)
+        address = transport.get_extra_info("sockname")[0:2]
+        self.devices.append((device, address))
+        return address
+
+    async def async_add_fleet(self, count: int, password: str = "1111") -> None:
+        for _ in range(count):
+            await self.async_add_device(
+                SimulatedDevice("SIM%013d" % len(self.devices), password)
+            )
+
+    def close(self) -> None:
+        for transport in self._transports:
+            transport.close()
+        self._transports.clear()
+
+
+async def _run(args: argparse.Namespace) -> None:
+    simulator = Simulator(
+        Faults(args.latency, args.jitter, args.loss, args.corruption), args.seed
+    )
+    await simulator.async_add_fleet(args.devices, args.password)
+    for device, (host, port) in simulator.devices:
+        print("%s %s:%d" % (device.device_id, host, port))
+    try:
+        await asyncio.Event().wait()
+    finally:
+        simulator.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--devices", type=int, default=1)
+    parser.add_argument("--password", default="1111")
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--loss", type=float, default=0.0)
+    parser.add_argument("--corruption", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None)
+    try:
+        asyncio.run(_run(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()